@@ -10,6 +10,7 @@ from services.claude_service import ClaudeService
 from services.twilio_service import TwilioService
 from services.email_service import EmailService
 from services.reminder_service import ReminderService
+from services.sms_queue import SmsQueue
 from handlers.action_handlers import ActionHandlers
 from routes.web_routes import web_bp
 from routes.pwa_routes import pwa_bp
@@ -25,7 +26,9 @@ def create_app():
     twilio_service = TwilioService(
         Config.TWILIO_ACCOUNT_SID,
         Config.TWILIO_AUTH_TOKEN,
-        Config.TWILIO_PHONE_NUMBER
+        Config.TWILIO_PHONE_NUMBER,
+        Config.TWILIO_PHONE_NUMBERS,
+        Config.TWILIO_MESSAGING_SERVICE_SID
     )
     email_service = EmailService(
         Config.SMTP_SERVER,
@@ -33,23 +36,40 @@ def create_app():
         Config.EMAIL_ADDRESS,
         Config.EMAIL_PASSWORD,
         Config.EMAIL_NAME,
-        Config.EMAIL_PROVIDER
+        Config.EMAIL_PROVIDER,
+        Config.EMAIL_WARM_IDLE_SECONDS
     )
+    sms_queue = None
+    if Config.SMS_QUEUE_ENABLED:
+        sms_queue = SmsQueue(
+            twilio_service,
+            Config.SMS_RATE_PER_NUMBER,
+            Config.SMS_BURST_PER_NUMBER,
+            Config.SMS_QUEUE_WORKERS,
+            Config.SMS_QUEUE_MAX_ATTEMPTS,
+            service_rate_per_second=Config.SMS_RATE_MESSAGING_SERVICE
+        )
+    # Reminders send inline: a due job handed to the in-memory queue would be lost on restart
     reminder_service = ReminderService(twilio_service, email_service)
-    action_handlers = ActionHandlers(twilio_service, email_service, claude_service, reminder_service)
+    action_handlers = ActionHandlers(twilio_service, email_service, claude_service, reminder_service, sms_queue)
     
     # Register blueprints
     app.register_blueprint(web_bp)
     app.register_blueprint(pwa_bp)
     
     # Initialize and register API routes with dependencies
-    api_blueprint = init_api_routes(action_handlers, reminder_service, twilio_service, email_service, claude_service)
+    api_blueprint = init_api_routes(action_handlers, reminder_service, twilio_service, email_service, claude_service, sms_queue)
     app.register_blueprint(api_blueprint)
     
     # Cleanup on app shutdown
     def cleanup_scheduler():
         """Cleanup scheduler on shutdown"""
         reminder_service.shutdown()
+        claude_service.close()
+        if sms_queue:
+            sms_queue.shutdown()
+        if twilio_service.delivery_status:
+            twilio_service.delivery_status.close()
     
     atexit.register(cleanup_scheduler)
     
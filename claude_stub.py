@@ -0,0 +1,230 @@
+"""Local stand-in for the Anthropic Messages API, for load tests and offline runs.
+
+Start it with `python claude_stub.py` and point the app at it with
+CLAUDE_BASE_URL=http://localhost:8765/v1/messages. Latency, errors and 429s
+are injected according to the CLAUDE_STUB_* environment variables below;
+responses are canned but deterministic for enhance, subject, email, batch,
+template, shorten and parse prompts, and carry a realistic `usage` block.
+"""
+from flask import Flask, Response, request, jsonify
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+
+# Latency distribution: fixed, uniform (mean +/- jitter) or lognormal (median = mean)
+LATENCY_DISTRIBUTION = os.getenv("CLAUDE_STUB_LATENCY_DISTRIBUTION", "lognormal")
+LATENCY_MS = float(os.getenv("CLAUDE_STUB_LATENCY_MS", "400"))
+LATENCY_JITTER_MS = float(os.getenv("CLAUDE_STUB_LATENCY_JITTER_MS", "200"))
+LATENCY_SIGMA = float(os.getenv("CLAUDE_STUB_LATENCY_SIGMA", "0.5"))
+# Delay between streamed text chunks
+TOKEN_DELAY_MS = float(os.getenv("CLAUDE_STUB_TOKEN_DELAY_MS", "15"))
+# Failure injection: fraction of requests answered with 500/529, and with 429
+ERROR_RATE = float(os.getenv("CLAUDE_STUB_ERROR_RATE", "0"))
+RATE_LIMIT_RATE = float(os.getenv("CLAUDE_STUB_RATE_LIMIT_RATE", "0"))
+RETRY_AFTER_SECONDS = int(os.getenv("CLAUDE_STUB_RETRY_AFTER", "1"))
+SEED = int(os.getenv("CLAUDE_STUB_SEED", "42"))
+PORT = int(os.getenv("CLAUDE_STUB_PORT", "8765"))
+
+app = Flask(__name__)
+_random = random.Random(SEED)
+_lock = threading.Lock()
+_cached_system_prompts = set()
+_stats = {"requests": 0, "streamed": 0, "errors": 0, "rate_limited": 0, "input_tokens": 0, "output_tokens": 0}
+
+def _sample_latency() -> float:
+    """Seconds to wait before answering, drawn from the configured distribution"""
+    with _lock:
+        if LATENCY_DISTRIBUTION == "fixed":
+            latency_ms = LATENCY_MS
+        elif LATENCY_DISTRIBUTION == "uniform":
+            latency_ms = _random.uniform(LATENCY_MS - LATENCY_JITTER_MS, LATENCY_MS + LATENCY_JITTER_MS)
+        else:
+            latency_ms = _random.lognormvariate(math.log(max(LATENCY_MS, 1)), LATENCY_SIGMA)
+    return max(latency_ms, 0) / 1000.0
+
+def _roll(rate: float) -> bool:
+    """Seeded coin flip for failure injection"""
+    with _lock:
+        return rate > 0 and _random.random() < rate
+
+def _count_tokens(text: str) -> int:
+    """Approximate token count (about 4 characters per token)"""
+    return max(len(text) // 4, 1)
+
+def _tidy(text: str) -> str:
+    """Deterministic 'enhancement': voice artifacts, spacing, capitalization, final punctuation"""
+    text = text.replace(" period", ".").replace(" comma", ",").replace(" question mark", "?")
+    text = re.sub(r"\bi\b", "I", re.sub(r"\s+", " ", text)).strip()
+    if not text:
+        return text
+    text = text[0].upper() + text[1:]
+    return text if text[-1] in ".!?" else text + "."
+
+def _subject_for(text: str) -> str:
+    """Short title-cased subject from the first words of a message"""
+    words = re.sub(r"[^\w\s']", "", text).split()[:6]
+    return " ".join(word.capitalize() for word in words)[:50] or "Message"
+
+def _quoted(prompt: str, label: str) -> str:
+    """Text inside `label: "..."` in one of ClaudeService's prompts"""
+    match = re.search(label + r': "(.*?)"\s*\n', prompt, re.DOTALL)
+    return match.group(1) if match else prompt
+
+def _parse_reply(command: str) -> str:
+    """Structured action for a parse_command request, pretty-printed like the real model tends to"""
+    message_match = re.search(r"\b(?:saying|that)\s+(.+)$", command, re.IGNORECASE)
+    email_match = re.search(r"[\w.%+-]+@[\w.-]+\.[A-Za-z]{2,}", command)
+    phone_match = re.search(r"\+?\d[\d\-\s().]{8,}\d", command)
+    if email_match or phone_match:
+        action = {
+            "action": "send_email" if email_match else "send_message",
+            "recipient": (email_match or phone_match).group(0),
+            "message": message_match.group(1) if message_match else command
+        }
+    else:
+        action = {"action": "create_task", "title": command.strip()}
+    return json.dumps(action, indent=2)
+
+def _canned_reply(body) -> str:
+    """Deterministic output for each kind of prompt ClaudeService sends"""
+    prompt = body["messages"][-1]["content"]
+    if isinstance(prompt, list):
+        prompt = " ".join(block.get("text", "") for block in prompt)
+    system = body.get("system")
+
+    if system or "Supported actions" in prompt:
+        return _parse_reply(prompt.split("User:")[-1] if not system else prompt)
+    if "Messages (JSON):" in prompt:
+        items = json.loads(re.search(r"Messages \(JSON\): (\[.*?\])\s*\n", prompt, re.DOTALL).group(1))
+        return json.dumps([{"id": item["id"], "enhanced": _tidy(item["message"])} for item in items])
+    if "Original template:" in prompt:
+        return _tidy(_quoted(prompt, "Original template"))
+    if '"subject"' in prompt:
+        message = _tidy(_quoted(prompt, "Original message"))
+        return json.dumps({"message": message, "subject": _subject_for(message)})
+    if "Shorten this text message" in prompt:
+        limit = int(re.search(r"at most (\d+) characters", prompt).group(1))
+        message = _tidy(_quoted(prompt, "Original message"))
+        return message if len(message) <= limit else message[:limit - 3].rsplit(" ", 1)[0] + "..."
+    if "subject line" in prompt:
+        return _subject_for(_quoted(prompt, "Message content"))
+    return _tidy(_quoted(prompt, "Original message"))
+
+def _apply_limits(text: str, body):
+    """Honor stop_sequences and max_tokens the way the API does"""
+    for stop in body.get("stop_sequences") or []:
+        index = text.find(stop)
+        if index != -1:
+            return text[:index], "stop_sequence", stop
+    max_chars = body.get("max_tokens", 1024) * 4
+    if len(text) > max_chars:
+        return text[:max_chars], "max_tokens", None
+    return text, "end_turn", None
+
+def _usage(body, output_text: str):
+    """usage block, including prompt-cache reads/writes for cacheable system prompts"""
+    prompt_text = json.dumps(body.get("messages", []))
+    usage = {"input_tokens": _count_tokens(prompt_text), "output_tokens": _count_tokens(output_text)}
+    system = body.get("system")
+    if isinstance(system, list) and any(block.get("cache_control") for block in system):
+        system_text = "".join(block.get("text", "") for block in system)
+        with _lock:
+            cached = system_text in _cached_system_prompts
+            _cached_system_prompts.add(system_text)
+        usage["cache_read_input_tokens" if cached else "cache_creation_input_tokens"] = _count_tokens(system_text)
+    elif system:
+        usage["input_tokens"] += _count_tokens(str(system))
+    with _lock:
+        _stats["input_tokens"] += usage["input_tokens"]
+        _stats["output_tokens"] += usage["output_tokens"]
+    return usage
+
+def _error(status: int, error_type: str, message: str, headers=None):
+    """Error body in the Messages API format"""
+    response = jsonify({"type": "error", "error": {"type": error_type, "message": message}})
+    response.status_code = status
+    for name, value in (headers or {}).items():
+        response.headers[name] = value
+    return response
+
+def _stream(body, text: str, stop_reason: str, stop_sequence, usage):
+    """Server-sent events matching the streaming Messages API"""
+    def event(name, payload):
+        return f"event: {name}\ndata: {json.dumps(payload)}\n\n"
+
+    def generate():
+        start_usage = {k: v for k, v in usage.items() if k != "output_tokens"}
+        start_usage["output_tokens"] = 1
+        yield event("message_start", {"type": "message_start", "message": {
+            "id": f"msg_stub_{int(time.time() * 1000)}", "type": "message", "role": "assistant",
+            "model": body.get("model"), "content": [], "stop_reason": None, "usage": start_usage
+        }})
+        yield event("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+        for chunk in re.findall(r"\S+\s*|\s+", text):
+            time.sleep(TOKEN_DELAY_MS / 1000.0)
+            yield event("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": chunk}})
+        yield event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        yield event("message_delta", {"type": "message_delta", "delta": {"stop_reason": stop_reason, "stop_sequence": stop_sequence},
+                                      "usage": {"output_tokens": usage["output_tokens"]}})
+        yield event("message_stop", {"type": "message_stop"})
+
+    return Response(generate(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.route("/v1/messages", methods=["POST"])
+def messages():
+    """Messages API stand-in"""
+    if not request.headers.get("x-api-key"):
+        return _error(401, "authentication_error", "x-api-key header is required")
+    body = request.get_json(silent=True)
+    if not body or not body.get("messages") or not body.get("model"):
+        return _error(400, "invalid_request_error", "model and messages are required")
+
+    with _lock:
+        _stats["requests"] += 1
+    time.sleep(_sample_latency())
+
+    if _roll(RATE_LIMIT_RATE):
+        with _lock:
+            _stats["rate_limited"] += 1
+        return _error(429, "rate_limit_error", "Number of requests has exceeded your rate limit",
+                      {"retry-after": str(RETRY_AFTER_SECONDS)})
+    if _roll(ERROR_RATE):
+        with _lock:
+            _stats["errors"] += 1
+        if _roll(0.5):
+            return _error(529, "overloaded_error", "Overloaded")
+        return _error(500, "api_error", "Internal server error")
+
+    text, stop_reason, stop_sequence = _apply_limits(_canned_reply(body), body)
+    usage = _usage(body, text)
+
+    if body.get("stream"):
+        with _lock:
+            _stats["streamed"] += 1
+        return _stream(body, text, stop_reason, stop_sequence, usage)
+
+    return jsonify({
+        "id": f"msg_stub_{int(time.time() * 1000)}",
+        "type": "message",
+        "role": "assistant",
+        "model": body["model"],
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": stop_reason,
+        "stop_sequence": stop_sequence,
+        "usage": usage
+    })
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    """Counters for checking what a benchmark actually sent"""
+    with _lock:
+        return jsonify(dict(_stats))
+
+if __name__ == "__main__":
+    print(f"🧪 Claude stand-in listening on http://localhost:{PORT}/v1/messages "
+          f"({LATENCY_DISTRIBUTION} latency ~{LATENCY_MS:.0f}ms, errors {ERROR_RATE:.0%}, 429s {RATE_LIMIT_RATE:.0%})")
+    app.run(host="0.0.0.0", port=PORT, threaded=True)
@@ -1,16 +1,139 @@
 import os
+import json
 import pytz
 
+def _operation_settings(name: str, max_tokens: int, temperature: float = 0.3, stop_sequences=None,
+                        restore_stop: bool = False, reject_truncated: bool = False) -> dict:
+    """Claude request settings for one operation, overridable via CLAUDE_<NAME>_* variables"""
+    prefix = f"CLAUDE_{name.upper()}_"
+    return {
+        "model": os.getenv(prefix + "MODEL", os.getenv("CLAUDE_MODEL", "claude-3-haiku-20240307")),
+        "max_tokens": int(os.getenv(prefix + "MAX_TOKENS", str(max_tokens))),
+        "temperature": float(os.getenv(prefix + "TEMPERATURE", str(temperature))),
+        # JSON list, e.g. CLAUDE_SUBJECT_STOP_SEQUENCES='["\\n"]'
+        "stop_sequences": json.loads(os.getenv(prefix + "STOP_SEQUENCES", json.dumps(stop_sequences or []))),
+        # Put the matched stop sequence back (the API strips it), e.g. the closing brace of parse JSON
+        "restore_stop": restore_stop,
+        # Treat a reply cut off at max_tokens as a failure rather than sending (and caching) half a message
+        "reject_truncated": reject_truncated
+    }
+
 class Config:
     """Application configuration"""
     
     # Claude AI
     CLAUDE_API_KEY = os.getenv("CLAUDE_API_KEY", "")
+    # Messages API endpoint; point at claude_stub.py for load tests and offline runs
+    CLAUDE_BASE_URL = os.getenv("CLAUDE_BASE_URL", "https://api.anthropic.com/v1/messages")
+    
+    # Per-operation model routing and token budgets
+    CLAUDE_OPERATIONS = {
+        "enhance": _operation_settings("enhance", max_tokens=400, reject_truncated=True),
+        "subject": _operation_settings("subject", max_tokens=30, stop_sequences=["\n"]),
+        "email": _operation_settings("email", max_tokens=500, reject_truncated=True),
+        "batch_enhance": _operation_settings("batch_enhance", max_tokens=2000, reject_truncated=True),
+        "parse": _operation_settings("parse", max_tokens=400, stop_sequences=["\n}"], restore_stop=True),
+        "shorten": _operation_settings("shorten", max_tokens=300, reject_truncated=True),
+    }
+    
+    # Claude HTTP connection pool (sized per process to the gunicorn thread count)
+    CLAUDE_POOL_SIZE = int(os.getenv("CLAUDE_POOL_SIZE", os.getenv("GUNICORN_THREADS", "20")))
+    CLAUDE_CONNECT_TIMEOUT = float(os.getenv("CLAUDE_CONNECT_TIMEOUT", "3.05"))
+    CLAUDE_READ_TIMEOUT = float(os.getenv("CLAUDE_READ_TIMEOUT", "30"))
+    CLAUDE_MAX_RETRIES = int(os.getenv("CLAUDE_MAX_RETRIES", "2"))
+    
+    # Latency budget for LLM work on interactive /execute requests
+    EXECUTE_LLM_BUDGET_MS = int(os.getenv("EXECUTE_LLM_BUDGET_MS", "5000"))
+    # How long /execute_stream waits past the budget (sends run after it) before closing the stream
+    EXECUTE_STREAM_GRACE_SECONDS = float(os.getenv("EXECUTE_STREAM_GRACE_SECONDS", "30"))
+    CLAUDE_MAX_QUEUE_DEPTH = int(os.getenv("CLAUDE_MAX_QUEUE_DEPTH", str(CLAUDE_POOL_SIZE)))
+    # Route Claude calls through the asyncio client (requires httpx)
+    CLAUDE_ASYNC_ENABLED = os.getenv("CLAUDE_ASYNC_ENABLED", "False").lower() == "true"
+    CLAUDE_MAX_CONCURRENCY = int(os.getenv("CLAUDE_MAX_CONCURRENCY", "200"))
+    # Send parse_command's instruction block as a cacheable system prompt
+    CLAUDE_PROMPT_CACHE_ENABLED = os.getenv("CLAUDE_PROMPT_CACHE_ENABLED", "True").lower() == "true"
+    CLAUDE_COALESCE_ENABLED = os.getenv("CLAUDE_COALESCE_ENABLED", "True").lower() == "true"
+    # Requests/tokens per minute budget shared by all worker processes through a SQLite file
+    CLAUDE_RATE_LIMIT_ENABLED = os.getenv("CLAUDE_RATE_LIMIT_ENABLED", "False").lower() == "true"
+    CLAUDE_RATE_LIMIT_PATH = os.getenv("CLAUDE_RATE_LIMIT_PATH", "claude_rate_limit.sqlite")
+    CLAUDE_RATE_LIMIT_RPM = int(os.getenv("CLAUDE_RATE_LIMIT_RPM", "50"))
+    CLAUDE_RATE_LIMIT_TPM = int(os.getenv("CLAUDE_RATE_LIMIT_TPM", "40000"))
+    CLAUDE_RATE_LIMIT_MAX_WAIT = float(os.getenv("CLAUDE_RATE_LIMIT_MAX_WAIT", "2"))
+    # Seconds between [CLAUDE METRICS] log lines (0 disables the periodic log)
+    CLAUDE_METRICS_LOG_INTERVAL = int(os.getenv("CLAUDE_METRICS_LOG_INTERVAL", "300"))
+    # Stream enhancement tokens from Claude on /execute_stream
+    CLAUDE_STREAMING_ENABLED = os.getenv("CLAUDE_STREAMING_ENABLED", "True").lower() == "true"
+    # Circuit breaker: stop calling Claude after consecutive failures/timeouts, probe again after a cool-down
+    CLAUDE_BREAKER_ENABLED = os.getenv("CLAUDE_BREAKER_ENABLED", "True").lower() == "true"
+    CLAUDE_BREAKER_FAILURE_THRESHOLD = int(os.getenv("CLAUDE_BREAKER_FAILURE_THRESHOLD", "5"))
+    CLAUDE_BREAKER_RESET_SECONDS = float(os.getenv("CLAUDE_BREAKER_RESET_SECONDS", "30"))
+    CLAUDE_BREAKER_HALF_OPEN_PROBES = int(os.getenv("CLAUDE_BREAKER_HALF_OPEN_PROBES", "1"))
+    # A call timing out with at least this budget (or the operation's p95, if lower) counts as a breaker failure
+    CLAUDE_BREAKER_MIN_BUDGET_MS = int(os.getenv("CLAUDE_BREAKER_MIN_BUDGET_MS", "2000"))
+    # Hedged requests: fire a second attempt once the first runs past the operation's p95 latency
+    CLAUDE_HEDGE_ENABLED = os.getenv("CLAUDE_HEDGE_ENABLED", "False").lower() == "true"
+    CLAUDE_HEDGE_MIN_SAMPLES = int(os.getenv("CLAUDE_HEDGE_MIN_SAMPLES", "20"))
+    
+    # Start Claude's parse in parallel with the regex stages when they are unlikely to match
+    SPECULATIVE_PARSE_ENABLED = os.getenv("SPECULATIVE_PARSE_ENABLED", "True").lower() == "true"
+    SPECULATIVE_PARSE_WORKERS = int(os.getenv("SPECULATIVE_PARSE_WORKERS", str(CLAUDE_POOL_SIZE)))
+    
+    # Local heuristic enhancer that skips Claude for already-clean short messages
+    LOCAL_ENHANCER_ENABLED = os.getenv("LOCAL_ENHANCER_ENABLED", "True").lower() == "true"
+    LOCAL_ENHANCER_MAX_WORDS = int(os.getenv("LOCAL_ENHANCER_MAX_WORDS", "30"))
+    
+    # Micro-batching of enhance_message calls arriving within a short window
+    CLAUDE_BATCH_ENABLED = os.getenv("CLAUDE_BATCH_ENABLED", "False").lower() == "true"
+    CLAUDE_BATCH_WINDOW_MS = int(os.getenv("CLAUDE_BATCH_WINDOW_MS", "20"))
+    CLAUDE_BATCH_MAX_ITEMS = int(os.getenv("CLAUDE_BATCH_MAX_ITEMS", "10"))
+    # Assumed batch call latency until real p95 samples exist
+    CLAUDE_BATCH_EXPECTED_LATENCY_MS = int(os.getenv("CLAUDE_BATCH_EXPECTED_LATENCY_MS", "1500"))
+    
+    # parse_command results cached by command template (numbers, emails, times, message abstracted)
+    PARSE_CACHE_ENABLED = os.getenv("PARSE_CACHE_ENABLED", "True").lower() == "true"
+    PARSE_CACHE_MAX_ENTRIES = int(os.getenv("PARSE_CACHE_MAX_ENTRIES", "2000"))
+    PARSE_CACHE_TTL = int(os.getenv("PARSE_CACHE_TTL", str(24 * 3600)))
+    
+    # Enhancement cache (memory LRU in front of a SQLite file shared by workers)
+    ENHANCE_CACHE_ENABLED = os.getenv("ENHANCE_CACHE_ENABLED", "True").lower() == "true"
+    ENHANCE_CACHE_PATH = os.getenv("ENHANCE_CACHE_PATH", "enhance_cache.sqlite")
+    ENHANCE_CACHE_TTL = int(os.getenv("ENHANCE_CACHE_TTL", str(7 * 24 * 3600)))
+    ENHANCE_CACHE_MAX_ENTRIES = int(os.getenv("ENHANCE_CACHE_MAX_ENTRIES", "10000"))
+    ENHANCE_CACHE_MEMORY_ENTRIES = int(os.getenv("ENHANCE_CACHE_MEMORY_ENTRIES", "1000"))
     
     # Twilio SMS
     TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID", "")
     TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN", "")
     TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER", "")
+    # Several sender numbers (comma-separated) or a Messaging Service SID raise SMS throughput past one long code
+    TWILIO_PHONE_NUMBERS = [n.strip() for n in os.getenv("TWILIO_PHONE_NUMBERS", TWILIO_PHONE_NUMBER).split(",") if n.strip()]
+    TWILIO_MESSAGING_SERVICE_SID = os.getenv("TWILIO_MESSAGING_SERVICE_SID", "")
+    SENDER_ASSIGNMENTS_PATH = os.getenv("SENDER_ASSIGNMENTS_PATH", "sender_assignments.sqlite")
+    # Threads fanning out multi-recipient SMS; the Twilio connection pool is sized to match
+    SMS_SEND_CONCURRENCY = int(os.getenv("SMS_SEND_CONCURRENCY", "5"))
+    TWILIO_POOL_SIZE = int(os.getenv("TWILIO_POOL_SIZE", str(SMS_SEND_CONCURRENCY)))
+    TWILIO_CONNECT_TIMEOUT = float(os.getenv("TWILIO_CONNECT_TIMEOUT", "3.05"))
+    TWILIO_READ_TIMEOUT = float(os.getenv("TWILIO_READ_TIMEOUT", "10"))
+    TWILIO_MAX_RETRIES = int(os.getenv("TWILIO_MAX_RETRIES", "2"))
+    # Outbound SMS queue paced per sender number (long codes take about one message per second)
+    SMS_QUEUE_ENABLED = os.getenv("SMS_QUEUE_ENABLED", "True").lower() == "true"
+    SMS_QUEUE_WORKERS = int(os.getenv("SMS_QUEUE_WORKERS", "4"))
+    SMS_RATE_PER_NUMBER = float(os.getenv("SMS_RATE_PER_NUMBER", "1"))
+    SMS_BURST_PER_NUMBER = int(os.getenv("SMS_BURST_PER_NUMBER", "1"))
+    # Messages per second through TWILIO_MESSAGING_SERVICE_SID; 0 leaves pacing to Twilio's own queue (429s still back off)
+    SMS_RATE_MESSAGING_SERVICE = float(os.getenv("SMS_RATE_MESSAGING_SERVICE", "0"))
+    SMS_QUEUE_MAX_ATTEMPTS = int(os.getenv("SMS_QUEUE_MAX_ATTEMPTS", "3"))
+    # Segment budget: swap typographic characters for GSM-7 ones so a message is not billed as UCS-2 (70 chars per
+    # segment); past SMS_MAX_SEGMENTS (0 = no limit) the overflow policy is "none", "trim" or "shorten" (ask Claude)
+    SMS_GSM_OPTIMIZE = os.getenv("SMS_GSM_OPTIMIZE", "True").lower() == "true"
+    SMS_MAX_SEGMENTS = int(os.getenv("SMS_MAX_SEGMENTS", "0"))
+    SMS_OVERFLOW_POLICY = os.getenv("SMS_OVERFLOW_POLICY", "none").lower()
+    # Delivery status: Twilio posts each status change to this public URL (ending in /twilio/status); empty turns it off
+    TWILIO_STATUS_CALLBACK_URL = os.getenv("TWILIO_STATUS_CALLBACK_URL", "")
+    TWILIO_VALIDATE_WEBHOOKS = os.getenv("TWILIO_VALIDATE_WEBHOOKS", "True").lower() == "true"
+    DELIVERY_STATUS_PATH = os.getenv("DELIVERY_STATUS_PATH", "delivery_status.sqlite")
+    DELIVERY_STATUS_MEMORY_ENTRIES = int(os.getenv("DELIVERY_STATUS_MEMORY_ENTRIES", "2000"))
+    DELIVERY_STATUS_RETENTION = int(os.getenv("DELIVERY_STATUS_RETENTION", str(7 * 24 * 3600)))
     
     # Default Contact Information (for "me" commands)
     DEFAULT_PHONE_NUMBER = os.getenv("DEFAULT_PHONE_NUMBER", "")
@@ -29,6 +152,21 @@ class Config:
     PORT = int(os.getenv("PORT", 10000))
     DEBUG = os.getenv("DEBUG", "False").lower() == "true"
     
+    # Store reminders with the raw text and enhance them in the background before they fire
+    REMINDER_BACKGROUND_ENHANCE = os.getenv("REMINDER_BACKGROUND_ENHANCE", "True").lower() == "true"
+    REMINDER_ENHANCE_WORKERS = int(os.getenv("REMINDER_ENHANCE_WORKERS", "4"))
+    REMINDER_ENHANCE_BUDGET_MS = int(os.getenv("REMINDER_ENHANCE_BUDGET_MS", "30000"))
+    REMINDER_ENHANCE_MARGIN_SECONDS = int(os.getenv("REMINDER_ENHANCE_MARGIN_SECONDS", "5"))
+    
+    # Speculative parse, enhancement and connection warm-up from interim speech transcripts (/prefetch)
+    PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "True").lower() == "true"
+    PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "4"))
+    PREFETCH_STABLE_UPDATES = int(os.getenv("PREFETCH_STABLE_UPDATES", "2"))
+    PREFETCH_ENHANCE_BUDGET_MS = int(os.getenv("PREFETCH_ENHANCE_BUDGET_MS", "10000"))
+    PREFETCH_SESSION_TTL = int(os.getenv("PREFETCH_SESSION_TTL", "60"))
+    # How long a pre-opened, logged-in SMTP connection is kept for the next send
+    EMAIL_WARM_IDLE_SECONDS = int(os.getenv("EMAIL_WARM_IDLE_SECONDS", "30"))
+    
     # Scheduler Configuration
     SCHEDULER_JOBSTORE_URL = "sqlite:///jobs.sqlite"
     SCHEDULER_TIMEZONE = pytz.timezone(TIMEZONE)
@@ -1,17 +1,177 @@
 import concurrent.futures
 from datetime import datetime
-from typing import Dict, Any, List
-from utils.formatters import is_phone_number, is_email_address, format_phone_number
+from typing import Dict, Any, List, Optional, Tuple
+from utils.formatters import is_phone_number, is_email_address, format_phone_number, render_template
+from utils.deadline import Deadline
+from utils.sms_encoding import count_segments, to_gsm7
+from services.local_enhancer import LocalEnhancer
 from config import Config
 
 class ActionHandlers:
     """Handle various actions dispatched by the application"""
     
-    def __init__(self, twilio_service, email_service, claude_service, reminder_service):
+    def __init__(self, twilio_service, email_service, claude_service, reminder_service, sms_queue=None):
         self.twilio_service = twilio_service
+        self.sms_queue = sms_queue
         self.email_service = email_service
         self.claude_service = claude_service
         self.reminder_service = reminder_service
+        self.local_enhancer = LocalEnhancer(Config.LOCAL_ENHANCER_MAX_WORDS) if Config.LOCAL_ENHANCER_ENABLED else None
+        self._reminder_executor = None
+        if Config.REMINDER_BACKGROUND_ENHANCE:
+            self._reminder_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=Config.REMINDER_ENHANCE_WORKERS, thread_name_prefix="reminder-enhance"
+            )
+    
+    def _enhance(self, message: str, deadline: Optional[Deadline] = None) -> str:
+        """Enhance a message locally when it is already clean enough, otherwise with Claude"""
+        prefetched = self._take_prefetched("enhance", message, deadline)
+        if prefetched is not None:
+            deadline.emit("enhanced", {"message": prefetched})
+            return prefetched
+        if self.local_enhancer:
+            local = self.local_enhancer.enhance(message)
+            if local is not None:
+                print(f"[LOCAL ENHANCER] Handled without Claude: {local}")
+                self.claude_service.metrics.record_cache("enhance", "local")
+                if deadline:
+                    deadline.emit("enhanced", {"message": local})
+                return local
+        enhanced = self.claude_service.enhance_message(message, deadline=deadline)
+        if deadline:
+            deadline.emit("enhanced", {"message": enhanced})
+        return enhanced
+    
+    def _enhance_email(self, message: str, deadline: Optional[Deadline] = None) -> Dict[str, str]:
+        """Enhance an email body and subject, only asking Claude for the subject when the body is clean"""
+        enhanced = self._take_prefetched("email", message, deadline)
+        if enhanced is not None:
+            deadline.emit("enhanced", enhanced)
+            return enhanced
+        if self.local_enhancer:
+            local = self.local_enhancer.enhance(message)
+            if local is not None:
+                print(f"[LOCAL ENHANCER] Handled without Claude: {local}")
+                self.claude_service.metrics.record_cache("email", "local")
+                enhanced = {"message": local, "subject": self.claude_service.generate_email_subject(local, deadline)}
+        if enhanced is None:
+            enhanced = self.claude_service.enhance_email(message, deadline=deadline)
+        if deadline:
+            deadline.emit("enhanced", enhanced)
+        return enhanced
+    
+    def _take_prefetched(self, kind: str, message: str, deadline: Optional[Deadline]):
+        """Result of an enhancement started from an interim transcript, if it finishes within the budget"""
+        future = deadline.prefetched.get((kind, message)) if deadline else None
+        if future is None:
+            return None
+        try:
+            result = future.result(timeout=deadline.remaining())
+        except Exception:
+            return None
+        if result is not None:
+            print(f"[PREFETCH] Reusing {kind} enhancement started from an interim transcript")
+            self.claude_service.metrics.record_cache(kind, "prefetched")
+        return result
+    
+    def enhance_ahead(self, kind: str, message: str, budget_ms: int):
+        """Run an enhancement before the command is final; None if it had to fall back to the raw text"""
+        deadline = Deadline(budget_ms)
+        result = self._enhance_email(message, deadline) if kind == "email" else self._enhance(message, deadline)
+        return None if deadline.degraded else result
+    
+    def prefetch_plan(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        """What dispatching a parsed command will need: its channel, resolved recipients and (kind, text) enhancements"""
+        action = command.get("action")
+        message = command.get("original_message", command.get("message", ""))
+        if action in ("send_message", "send_message_multi"):
+            channel, kind = "sms", "enhance"
+        elif action in ("send_email", "send_email_multi"):
+            channel, kind = "email", "enhance" if command.get("subject") else "email"
+        else:
+            return {"channel": None, "recipients": [], "enhancements": []}
+        
+        recipients = []
+        for recipient in command.get("recipients") or [command.get("recipient", "")]:
+            try:
+                recipient = self._resolve_recipient(recipient, channel)
+            except ValueError:
+                continue
+            recipients.append(format_phone_number(recipient) if channel == "sms" and is_phone_number(recipient) else recipient)
+        
+        enhancements: List[Tuple[str, str]] = [(kind, message)] if message else []
+        return {"channel": channel, "recipients": recipients, "enhancements": enhancements}
+    
+    def _enhance_template(self, template: str, deadline: Optional[Deadline] = None) -> str:
+        """Enhance a broadcast template once with its {placeholders} kept intact"""
+        enhanced = self.claude_service.enhance_template(template, deadline=deadline)
+        if deadline:
+            deadline.emit("enhanced", {"message": enhanced})
+        return enhanced
+    
+    def _fit_sms(self, message: str, deadline: Optional[Deadline] = None) -> str:
+        """Under the shorten policy, ask Claude for a shorter text when an SMS exceeds SMS_MAX_SEGMENTS"""
+        max_segments = Config.SMS_MAX_SEGMENTS
+        if Config.SMS_OVERFLOW_POLICY != "shorten" or max_segments <= 0:
+            return message
+        if count_segments(to_gsm7(message))["segments"] <= max_segments:
+            return message
+        # The prompt asks for plain punctuation, so aim for the GSM-7 budget; send_sms trims anything still over
+        max_chars = 160 if max_segments == 1 else 153 * max_segments
+        print(f"[ACTION] SMS over {max_segments} segment(s), asking Claude for a shorter version")
+        shortened = self.claude_service.shorten_sms(message, max_chars, deadline)
+        if deadline and shortened != message:
+            deadline.emit("enhanced", {"message": shortened})
+        return shortened
+    
+    @staticmethod
+    def _personalize(text: str, recipient: str, variables: Optional[Dict[str, Dict[str, str]]]) -> str:
+        """Render a template for one recipient; plain sends pass through unchanged"""
+        if variables is None:
+            return text
+        return render_template(text, variables.get(recipient, {}))
+    
+    def get_local_enhancer_stats(self) -> Dict[str, Any]:
+        """Report what share of enhancements were handled locally"""
+        if not self.local_enhancer:
+            return {"enabled": False}
+        return {"enabled": True, **self.local_enhancer.get_stats()}
+    
+    def _enhance_reminder_later(self, job_id: str, message: str, reminder_time: datetime, is_email: bool = False,
+                                email_subject: bool = False):
+        """Enhance a reminder that was stored with its raw text and update the job before it fires"""
+        def enhance_and_update():
+            seconds_left = (reminder_time - datetime.now(reminder_time.tzinfo)).total_seconds()
+            budget_ms = min((seconds_left - Config.REMINDER_ENHANCE_MARGIN_SECONDS) * 1000, Config.REMINDER_ENHANCE_BUDGET_MS)
+            if budget_ms <= 0:
+                print(f"[REMINDER] Not enough time to enhance {job_id}, keeping raw text")
+                return
+            
+            deadline = Deadline(int(budget_ms))
+            subject = None
+            if email_subject:
+                enhanced = self._enhance_email(message, deadline)
+                enhanced_message = enhanced["message"]
+                subject = f"Reminder: {enhanced['subject']}"
+            elif is_email:
+                enhanced_message = self._enhance(message, deadline)
+            else:
+                enhanced_message = self._fit_sms(self._enhance(message, deadline), deadline)
+            
+            if deadline.degraded:
+                print(f"[REMINDER] Enhancement for {job_id} did not finish in time, keeping raw text")
+                return
+            
+            result = self.reminder_service.update_reminder_message(job_id, enhanced_message, subject)
+            if result["success"]:
+                print(f"[REMINDER] ✨ Enhanced reminder {job_id}: {enhanced_message}")
+            else:
+                print(f"[REMINDER] ⚠️ Could not update reminder {job_id}: {result['error']}")
+        
+        future = self._reminder_executor.submit(enhance_and_update)
+        future.add_done_callback(
+            lambda f: f.exception() and print(f"[REMINDER] ❌ Background enhancement for {job_id} failed: {f.exception()}")
+        )
     
     def _resolve_recipient(self, recipient: str, message_type: str = "sms") -> str:
         """Resolve 'me' references to actual contact information"""
@@ -38,7 +198,7 @@ class ActionHandlers:
         print("[ACTION] Creating appointment:", data.get("title"), data.get("due_date"))
         return f"Appointment '{data.get('title')}' booked for {data.get('due_date')}."
     
-    def handle_send_message(self, data: Dict[str, Any]) -> str:
+    def handle_send_message(self, data: Dict[str, Any], deadline: Optional[Deadline] = None) -> str:
         """Handle single message sending"""
         recipient = data.get("recipient", "")
         message = data.get("message", "")
@@ -56,18 +216,22 @@ class ActionHandlers:
             formatted_phone = format_phone_number(recipient)
             print(f"[ACTION] Detected phone number, processing SMS to {formatted_phone}")
             
-            enhanced_message = self.claude_service.enhance_message(original_message)
-            result = self.twilio_service.send_sms(formatted_phone, enhanced_message)
+            enhanced_message = self._fit_sms(self._enhance(original_message, deadline), deadline)
+            result = self._deliver_sms(formatted_phone, enhanced_message)
+            if deadline:
+                deadline.emit("result", {"recipient": recipient, "type": "sms", **result})
             
+            if result.get('queued'):
+                return f"✅ Professional SMS queued for {recipient}!\n\nOriginal: {original_message}\nEnhanced: {result['body']}\n\nTicket: {result['ticket_id']}{self._format_segments(result)}"
             if result.get('success'):
-                return f"✅ Professional SMS sent to {recipient}!\n\nOriginal: {original_message}\nEnhanced: {enhanced_message}\n\nMessage ID: {result.get('message_sid', 'N/A')}"
+                return f"✅ Professional SMS sent to {recipient}!\n\nOriginal: {original_message}\nEnhanced: {result['body']}\n\nMessage ID: {result.get('message_sid', 'N/A')}{self._format_segments(result)}"
             else:
                 return f"Failed to send SMS to {recipient}: {result.get('error')}"
         else:
-            enhanced_message = self.claude_service.enhance_message(message)
+            enhanced_message = self._enhance(message, deadline)
             return f"Enhanced message for {recipient}:\nOriginal: {message}\nEnhanced: {enhanced_message}"
     
-    def handle_send_email(self, data: Dict[str, Any]) -> str:
+    def handle_send_email(self, data: Dict[str, Any], deadline: Optional[Deadline] = None) -> str:
         """Handle single email sending"""
         recipient = data.get("recipient", "")
         message = data.get("message", "")
@@ -83,22 +247,26 @@ class ActionHandlers:
         print(f"[ACTION] Sending email to {recipient}")
         
         if is_email_address(recipient):
-            enhanced_message = self.claude_service.enhance_message(original_message)
-            
-            if not subject:
-                subject = self.claude_service.generate_email_subject(enhanced_message)
+            if subject:
+                enhanced_message = self._enhance(original_message, deadline)
+            else:
+                enhanced = self._enhance_email(original_message, deadline)
+                enhanced_message = enhanced["message"]
+                subject = enhanced["subject"]
             
             result = self.email_service.send_email(recipient, subject, enhanced_message)
+            if deadline:
+                deadline.emit("result", {"recipient": recipient, "type": "email", **result})
             
             if result.get('success'):
                 return f"✅ Professional email sent to {recipient}!\n\nSubject: {subject}\nOriginal: {original_message}\nEnhanced: {enhanced_message}\n\nSent at: {result.get('timestamp', 'N/A')}"
             else:
                 return f"Failed to send email to {recipient}: {result.get('error')}"
         else:
-            enhanced_message = self.claude_service.enhance_message(message)
+            enhanced_message = self._enhance(message, deadline)
             return f"Enhanced message for {recipient}:\nOriginal: {message}\nEnhanced: {enhanced_message}\n\nNote: {recipient} is not a valid email address"
     
-    def handle_send_message_multi(self, data: Dict[str, Any]) -> str:
+    def handle_send_message_multi(self, data: Dict[str, Any], deadline: Optional[Deadline] = None) -> str:
         """Handle multi-recipient message sending"""
         recipients = data.get("recipients", [])
         message = data.get("message", "")
@@ -115,10 +283,10 @@ class ActionHandlers:
             except ValueError as e:
                 return f"❌ {str(e)}"
         
-        result = self.send_sms_to_multiple(resolved_recipients, original_message, enhance=True)
+        result = self.send_sms_to_multiple(resolved_recipients, original_message, enhance=True, deadline=deadline)
         return self._format_multi_response(result, "message")
     
-    def handle_send_email_multi(self, data: Dict[str, Any]) -> str:
+    def handle_send_email_multi(self, data: Dict[str, Any], deadline: Optional[Deadline] = None) -> str:
         """Handle multi-recipient email sending"""
         recipients = data.get("recipients", [])
         message = data.get("message", "")
@@ -136,10 +304,10 @@ class ActionHandlers:
             except ValueError as e:
                 return f"❌ {str(e)}"
         
-        result = self.send_emails_to_multiple(resolved_recipients, subject, original_message, enhance=True)
+        result = self.send_emails_to_multiple(resolved_recipients, subject, original_message, enhance=True, deadline=deadline)
         return self._format_multi_response(result, "email")
     
-    def handle_schedule_sms_reminder(self, data: Dict[str, Any]) -> str:
+    def handle_schedule_sms_reminder(self, data: Dict[str, Any], deadline: Optional[Deadline] = None) -> str:
         """Handle SMS reminder scheduling"""
         recipient = data.get("recipient", "")
         message = data.get("message", "")
@@ -164,7 +332,16 @@ class ActionHandlers:
         try:
             reminder_time = datetime.fromisoformat(reminder_time_str.replace('Z', '+00:00'))
             formatted_phone = format_phone_number(recipient)
-            enhanced_message = self.claude_service.enhance_message(message)
+            
+            # Store the raw text right away; the enhanced text replaces it before the reminder fires
+            if self._reminder_executor:
+                result = self.reminder_service.schedule_sms_reminder(formatted_phone, message, reminder_time)
+                if result["success"]:
+                    self._enhance_reminder_later(result["job_id"], message, reminder_time)
+                    return f"✅ SMS reminder scheduled!\n\n📱 To: {recipient}\n⏰ When: {result['message']}\n💬 Message: {message} (polishing in the background)\n🆔 Reminder ID: {result['job_id']}"
+                return f"❌ {result['error']}"
+            
+            enhanced_message = self._fit_sms(self._enhance(message, deadline), deadline)
             
             result = self.reminder_service.schedule_sms_reminder(formatted_phone, enhanced_message, reminder_time)
             
@@ -176,7 +353,7 @@ class ActionHandlers:
         except Exception as e:
             return f"❌ Failed to schedule SMS reminder: {str(e)}"
     
-    def handle_schedule_email_reminder(self, data: Dict[str, Any]) -> str:
+    def handle_schedule_email_reminder(self, data: Dict[str, Any], deadline: Optional[Deadline] = None) -> str:
         """Handle email reminder scheduling"""
         recipient = data.get("recipient", "")
         message = data.get("message", "")
@@ -197,10 +374,23 @@ class ActionHandlers:
         
         try:
             reminder_time = datetime.fromisoformat(reminder_time_str.replace('Z', '+00:00'))
-            enhanced_message = self.claude_service.enhance_message(message)
             
-            if not subject:
-                subject = f"Reminder: {self.claude_service.generate_email_subject(enhanced_message)}"
+            # Store the raw text right away; the enhanced text replaces it before the reminder fires
+            if self._reminder_executor:
+                raw_subject = subject or f"Reminder: {self.claude_service.DEFAULT_SUBJECT}"
+                result = self.reminder_service.schedule_email_reminder(recipient, raw_subject, message, reminder_time)
+                if result["success"]:
+                    self._enhance_reminder_later(result["job_id"], message, reminder_time, is_email=True,
+                                                 email_subject=not subject)
+                    return f"✅ Email reminder scheduled!\n\n📧 To: {recipient}\n⏰ When: {result['message']}\n📨 Subject: {raw_subject}\n💬 Message: {message} (polishing in the background)\n🆔 Reminder ID: {result['job_id']}"
+                return f"❌ {result['error']}"
+            
+            if subject:
+                enhanced_message = self._enhance(message, deadline)
+            else:
+                enhanced = self._enhance_email(message, deadline)
+                enhanced_message = enhanced["message"]
+                subject = f"Reminder: {enhanced['subject']}"
             
             result = self.reminder_service.schedule_email_reminder(recipient, subject, enhanced_message, reminder_time)
             
@@ -217,17 +407,26 @@ class ActionHandlers:
         print("[ACTION] Logging conversation:", data.get("notes"))
         return "Conversation log saved."
     
-    def send_sms_to_multiple(self, recipients: List[str], message: str, enhance: bool = True) -> Dict[str, Any]:
-        """Send SMS to multiple recipients with threading"""
-        enhanced_message = self.claude_service.enhance_message(message) if enhance else message
+    def send_sms_to_multiple(self, recipients: List[str], message: str, enhance: bool = True, deadline: Optional[Deadline] = None,
+                             variables: Optional[Dict[str, Dict[str, str]]] = None) -> Dict[str, Any]:
+        """Send SMS to multiple recipients with threading
+        
+        With variables (recipient -> {placeholder: value}), message is a template enhanced once and rendered per recipient.
+        """
+        if variables is not None:
+            # Not fitted to the segment budget: trimming or shortening could drop placeholders, and the
+            # rendered length depends on each recipient's values
+            enhanced_message = self._enhance_template(message, deadline) if enhance else message
+        else:
+            enhanced_message = self._fit_sms(self._enhance(message, deadline) if enhance else message, deadline)
         
         results = []
         successful_sends = 0
         failed_sends = 0
         
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=Config.SMS_SEND_CONCURRENCY) as executor:
             future_to_recipient = {
-                executor.submit(self._send_single_sms, recipient, enhanced_message): recipient 
+                executor.submit(self._send_single_sms, recipient, self._personalize(enhanced_message, recipient, variables)): recipient 
                 for recipient in recipients
             }
             
@@ -244,14 +443,17 @@ class ActionHandlers:
                         failed_sends += 1
                         
                 except Exception as exc:
-                    error_result = {
+                    result = {
                         'recipient': recipient,
                         'success': False,
                         'error': f'Exception occurred: {exc}',
                         'type': 'sms'
                     }
-                    results.append(error_result)
+                    results.append(result)
                     failed_sends += 1
+                
+                if deadline:
+                    deadline.emit("result", result)
         
         return {
             "success": successful_sends > 0,
@@ -260,16 +462,29 @@ class ActionHandlers:
             "failed_sends": failed_sends,
             "original_message": message,
             "enhanced_message": enhanced_message,
+            "template": variables is not None,
             "results": results,
             "type": "sms_multi"
         }
     
-    def send_emails_to_multiple(self, recipients: List[str], subject: str, message: str, enhance: bool = True) -> Dict[str, Any]:
-        """Send emails to multiple recipients with threading"""
-        enhanced_message = self.claude_service.enhance_message(message) if enhance else message
-        
-        if not subject:
-            subject = self.claude_service.generate_email_subject(enhanced_message)
+    def send_emails_to_multiple(self, recipients: List[str], subject: str, message: str, enhance: bool = True, deadline: Optional[Deadline] = None,
+                                variables: Optional[Dict[str, Dict[str, str]]] = None) -> Dict[str, Any]:
+        """Send emails to multiple recipients with threading
+        
+        With variables (recipient -> {placeholder: value}), subject and message are templates rendered per recipient.
+        """
+        if variables is not None:
+            enhanced_message = self._enhance_template(message, deadline) if enhance else message
+            if not subject:
+                subject = self.claude_service.generate_email_subject(enhanced_message, deadline)
+        elif enhance and not subject:
+            enhanced = self._enhance_email(message, deadline)
+            enhanced_message = enhanced["message"]
+            subject = enhanced["subject"]
+        else:
+            enhanced_message = self._enhance(message, deadline) if enhance else message
+            if not subject:
+                subject = self.claude_service.generate_email_subject(enhanced_message, deadline)
         
         results = []
         successful_sends = 0
@@ -277,7 +492,12 @@ class ActionHandlers:
         
         with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
             future_to_recipient = {
-                executor.submit(self._send_single_email, recipient, subject, enhanced_message): recipient 
+                executor.submit(
+                    self._send_single_email,
+                    recipient,
+                    self._personalize(subject, recipient, variables),
+                    self._personalize(enhanced_message, recipient, variables)
+                ): recipient
                 for recipient in recipients
             }
             
@@ -294,14 +514,17 @@ class ActionHandlers:
                         failed_sends += 1
                         
                 except Exception as exc:
-                    error_result = {
+                    result = {
                         'recipient': recipient,
                         'success': False,
                         'error': f'Exception occurred: {exc}',
                         'type': 'email'
                     }
-                    results.append(error_result)
+                    results.append(result)
                     failed_sends += 1
+                
+                if deadline:
+                    deadline.emit("result", result)
         
         return {
             "success": successful_sends > 0,
@@ -311,11 +534,12 @@ class ActionHandlers:
             "original_message": message,
             "enhanced_message": enhanced_message,
             "subject": subject,
+            "template": variables is not None,
             "results": results,
             "type": "email_multi"
         }
     
-    def send_mixed_messages(self, recipients: List[str], message: str, subject: str = None, enhance: bool = True) -> Dict[str, Any]:
+    def send_mixed_messages(self, recipients: List[str], message: str, subject: str = None, enhance: bool = True, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """Send messages to mixed recipients (SMS for phones, emails for email addresses)"""
         # Resolve 'me' references in recipients
         resolved_recipients = []
@@ -340,7 +564,7 @@ class ActionHandlers:
         email_recipients = [r for r in resolved_recipients if is_email_address(r)]
         other_recipients = [r for r in resolved_recipients if not is_phone_number(r) and not is_email_address(r)]
         
-        enhanced_message = self.claude_service.enhance_message(message) if enhance else message
+        enhanced_message = self._enhance(message, deadline) if enhance else message
         
         results = []
         successful_sends = 0
@@ -348,14 +572,14 @@ class ActionHandlers:
         
         # Send SMS to phone numbers
         if phone_recipients:
-            sms_result = self.send_sms_to_multiple(phone_recipients, message, enhance=False)
+            sms_result = self.send_sms_to_multiple(phone_recipients, message, enhance=False, deadline=deadline)
             results.extend(sms_result.get('results', []))
             successful_sends += sms_result.get('successful_sends', 0)
             failed_sends += sms_result.get('failed_sends', 0)
         
         # Send emails to email addresses
         if email_recipients:
-            email_result = self.send_emails_to_multiple(email_recipients, subject, message, enhance=False)
+            email_result = self.send_emails_to_multiple(email_recipients, subject, message, enhance=False, deadline=deadline)
             results.extend(email_result.get('results', []))
             successful_sends += email_result.get('successful_sends', 0)
             failed_sends += email_result.get('failed_sends', 0)
@@ -385,11 +609,25 @@ class ActionHandlers:
             "type": "mixed_multi"
         }
     
+    @staticmethod
+    def _format_segments(result: Dict[str, Any]) -> str:
+        """Segment line for a send response, noting what GSM-7 fitting saved"""
+        if not result.get("segments"):
+            return ""
+        saved = result.get("segments_saved", 0)
+        return f"\nSegments: {result['segments']}" + (f" ({saved} saved)" if saved > 0 else "")
+    
+    def _deliver_sms(self, phone: str, message: str) -> Dict[str, Any]:
+        """Hand an SMS to the paced outbound queue, or send it directly when the queue is off"""
+        if self.sms_queue:
+            return self.sms_queue.enqueue(phone, message)
+        return self.twilio_service.send_sms(phone, message)
+    
     def _send_single_sms(self, recipient: str, message: str) -> Dict[str, Any]:
         """Send SMS to a single recipient"""
         if is_phone_number(recipient):
             formatted_phone = format_phone_number(recipient)
-            result = self.twilio_service.send_sms(formatted_phone, message)
+            result = self._deliver_sms(formatted_phone, message)
             result['formatted_recipient'] = formatted_phone
             result['original_recipient'] = recipient
             result['type'] = 'sms'
@@ -420,13 +658,19 @@ class ActionHandlers:
     def _format_multi_response(self, result: Dict[str, Any], message_type: str) -> str:
         """Format response for multi-recipient operations"""
         if result["success"]:
-            success_msg = f"✅ {message_type.title()} sent to {result['successful_sends']}/{result['total_recipients']} recipients!"
+            verb = "queued for" if any(res.get("queued") for res in result["results"]) else "sent to"
+            success_msg = f"✅ {message_type.title()} {verb} {result['successful_sends']}/{result['total_recipients']} recipients!"
             success_msg += f"\n\nOriginal: {result['original_message']}"
             success_msg += f"\nEnhanced: {result['enhanced_message']}"
             
             if result.get('subject'):
                 success_msg += f"\nSubject: {result['subject']}"
             
+            segments = sum(res.get("segments", 0) for res in result["results"] if res.get("success"))
+            if segments:
+                saved = sum(res.get("segments_saved", 0) for res in result["results"] if res.get("success"))
+                success_msg += f"\nSegments: {segments}" + (f" ({saved} saved)" if saved > 0 else "")
+            
             if result["failed_sends"] > 0:
                 success_msg += f"\n\n⚠️ {result['failed_sends']} {message_type}s failed to send"
                 
@@ -435,6 +679,8 @@ class ActionHandlers:
                 status = "✅" if res.get("success") else "❌"
                 recipient = res.get("original_recipient", res.get("recipient", "Unknown"))
                 success_msg += f"\n{status} {recipient}"
+                if res.get("queued"):
+                    success_msg += f" (ticket {res['ticket_id']})"
                 if not res.get("success"):
                     success_msg += f" - {res.get('error', 'Unknown error')}"
             
@@ -442,7 +688,7 @@ class ActionHandlers:
         else:
             return f"❌ Failed to send {message_type}s to all {result['total_recipients']} recipients"
     
-    def dispatch_action(self, parsed: Dict[str, Any]) -> str:
+    def dispatch_action(self, parsed: Dict[str, Any], deadline: Optional[Deadline] = None) -> str:
         """Dispatch action based on parsed command"""
         action = parsed.get("action")
         
@@ -458,8 +704,15 @@ class ActionHandlers:
             "log_conversation": self.handle_log_conversation,
         }
         
+        deadline_aware = {
+            "send_message", "send_message_multi", "send_email", "send_email_multi",
+            "schedule_sms_reminder", "schedule_email_reminder"
+        }
+        
         handler = action_map.get(action)
         if handler:
+            if action in deadline_aware:
+                return handler(parsed, deadline)
             return handler(parsed)
         else:
             return f"Unknown action: {action}"
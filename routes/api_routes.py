@@ -1,76 +1,128 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from datetime import datetime
+import json
+import queue
 import re
-from utils.formatters import is_phone_number, is_email_address, parse_recipients
+import threading
+from utils.formatters import is_phone_number, is_email_address, parse_recipients, format_phone_number
 from services.message_parser import MessageParser
+from services.speculative_parser import SpeculativeParser
+from services.prefetcher import CommandPrefetcher
+from utils.deadline import Deadline
+from config import Config
 
 api_bp = Blueprint('api', __name__)
 
-def init_api_routes(action_handlers, reminder_service, twilio_service, email_service, claude_service):
+def _with_degradation(payload, deadline):
+    """Record in the response whether any LLM stage fell back to the raw text"""
+    payload["degraded"] = deadline.degraded
+    if deadline.degraded:
+        payload["degradations"] = deadline.degradations
+    return payload
+
+def _latency_budget(data):
+    """Budget in ms from the request body, or None when it is not a positive integer"""
+    value = data.get("latency_budget_ms", Config.EXECUTE_LLM_BUDGET_MS)
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return None
+    try:
+        budget = int(value)
+    except (ValueError, OverflowError):
+        return None
+    return budget if budget > 0 else None
+
+def _sse(event, payload):
+    """Format one Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+def init_api_routes(action_handlers, reminder_service, twilio_service, email_service, claude_service, sms_queue=None):
     """Initialize API routes with dependency injection"""
+    speculative_parser = None
+    if Config.SPECULATIVE_PARSE_ENABLED:
+        speculative_parser = SpeculativeParser(claude_service, Config.SPECULATIVE_PARSE_WORKERS)
+    prefetcher = None
+    if Config.PREFETCH_ENABLED:
+        prefetcher = CommandPrefetcher(
+            action_handlers, twilio_service, email_service, speculative_parser, Config.PREFETCH_WORKERS,
+            Config.PREFETCH_STABLE_UPDATES, Config.PREFETCH_ENHANCE_BUDGET_MS, Config.PREFETCH_SESSION_TTL
+        )
     
-    @api_bp.route('/execute', methods=['POST'])
-    def execute():
-        """Main command execution endpoint"""
+    def run_command(prompt, deadline, session_id=None):
+        """Run the command pipeline, returning the response payload and HTTP status"""
+        # Work started from this session's interim transcripts is reused when the final text matches
+        speculation = prefetcher.claim(session_id, prompt, deadline) if prefetcher and session_id else None
+        # Commands the regex stages will likely miss start their Claude parse right away
+        if speculation is None and speculative_parser:
+            speculation = speculative_parser.start(prompt)
+        try:
+            return run_pipeline(prompt, deadline, speculation)
+        finally:
+            if speculation:
+                speculative_parser.discard(speculation)
+    
+    def run_pipeline(prompt, deadline, speculation):
+        """Regex stages first, then Claude's parse (already running if speculation was started)"""
         try:
-            data = request.json
-            prompt = data.get("text", "")
-            
             # FIRST: Try reminder commands
             reminder_command = MessageParser.extract_reminder_command(prompt)
             if reminder_command:
+                deadline.emit("parse", {"command": reminder_command})
                 print(f"[VOICE REMINDER] Detected reminder command: {reminder_command}")
-                dispatch_result = action_handlers.handle_schedule_sms_reminder(reminder_command)
-                return jsonify({
+                dispatch_result = action_handlers.handle_schedule_sms_reminder(reminder_command, deadline)
+                return _with_degradation({
                     "response": dispatch_result,
                     "claude_output": reminder_command
-                })
+                }, deadline), 200
             
             # SECOND: Try email commands
             email_command = MessageParser.extract_email_command(prompt)
             if email_command:
+                deadline.emit("parse", {"command": email_command})
                 print(f"[VOICE EMAIL] Detected email command: {email_command}")
-                dispatch_result = action_handlers.handle_send_email(email_command)
-                return jsonify({
+                dispatch_result = action_handlers.handle_send_email(email_command, deadline)
+                return _with_degradation({
                     "response": dispatch_result,
                     "claude_output": email_command
-                })
+                }, deadline), 200
             
             # THIRD: Try multi-recipient email commands
             multi_email_command = MessageParser.extract_email_command_multi(prompt)
             if multi_email_command:
+                deadline.emit("parse", {"command": multi_email_command})
                 print(f"[VOICE EMAIL MULTI] Detected multi-recipient email: {multi_email_command}")
                 if multi_email_command["action"] == "send_email_multi":
-                    dispatch_result = action_handlers.handle_send_email_multi(multi_email_command)
+                    dispatch_result = action_handlers.handle_send_email_multi(multi_email_command, deadline)
                 else:
-                    dispatch_result = action_handlers.handle_send_email(multi_email_command)
-                return jsonify({
+                    dispatch_result = action_handlers.handle_send_email(multi_email_command, deadline)
+                return _with_degradation({
                     "response": dispatch_result,
                     "claude_output": multi_email_command
-                })
+                }, deadline), 200
             
             # FOURTH: Try SMS commands
             sms_command = MessageParser.extract_sms_command(prompt)
             if sms_command:
+                deadline.emit("parse", {"command": sms_command})
                 print(f"[VOICE SMS] Detected SMS command: {sms_command}")
-                dispatch_result = action_handlers.handle_send_message(sms_command)
-                return jsonify({
+                dispatch_result = action_handlers.handle_send_message(sms_command, deadline)
+                return _with_degradation({
                     "response": dispatch_result,
                     "claude_output": sms_command
-                })
+                }, deadline), 200
             
             # FIFTH: Try multi-recipient SMS
             multi_sms_command = MessageParser.extract_sms_command_multi(prompt)
             if multi_sms_command:
+                deadline.emit("parse", {"command": multi_sms_command})
                 print(f"[VOICE SMS MULTI] Detected multi-recipient SMS: {multi_sms_command}")
                 if multi_sms_command["action"] == "send_message_multi":
-                    dispatch_result = action_handlers.handle_send_message_multi(multi_sms_command)
+                    dispatch_result = action_handlers.handle_send_message_multi(multi_sms_command, deadline)
                 else:
-                    dispatch_result = action_handlers.handle_send_message(multi_sms_command)
-                return jsonify({
+                    dispatch_result = action_handlers.handle_send_message(multi_sms_command, deadline)
+                return _with_degradation({
                     "response": dispatch_result,
                     "claude_output": multi_sms_command
-                })
+                }, deadline), 200
             
             # SIXTH: Check for mixed message commands
             if "message" in prompt.lower() or "send" in prompt.lower():
@@ -91,7 +143,8 @@ def init_api_routes(action_handlers, reminder_service, twilio_service, email_ser
                         
                         if has_phone or has_email:
                             print(f"[MIXED MESSAGING] Detected mixed recipients: {recipients}")
-                            result = action_handlers.send_mixed_messages(recipients, message, enhance=True)
+                            deadline.emit("parse", {"command": {"action": "mixed_messaging", "recipients": recipients, "message": message}})
+                            result = action_handlers.send_mixed_messages(recipients, message, enhance=True, deadline=deadline)
                             
                             if result["success"]:
                                 response_msg = f"✅ Mixed messages sent to {result['successful_sends']}/{result['total_recipients']} recipients!"
@@ -115,7 +168,7 @@ def init_api_routes(action_handlers, reminder_service, twilio_service, email_ser
                                     if not res.get("success"):
                                         response_msg += f" - {res.get('error', 'Unknown error')}"
                                 
-                                return jsonify({
+                                return _with_degradation({
                                     "response": response_msg,
                                     "claude_output": {
                                         "action": "mixed_messaging",
@@ -123,23 +176,95 @@ def init_api_routes(action_handlers, reminder_service, twilio_service, email_ser
                                         "message": message,
                                         "result": result
                                     }
-                                })
+                                }, deadline), 200
             
             # SEVENTH: Fall back to Claude for other commands
-            result = claude_service.parse_command(prompt)
+            if speculation:
+                result = speculative_parser.resolve(speculation, prompt)
+            else:
+                result = claude_service.parse_command(prompt)
             
             if "error" in result:
-                return jsonify({"response": result["error"]}), 500
+                return {"response": result["error"]}, 500
 
-            dispatch_result = action_handlers.dispatch_action(result)
-            return jsonify({
+            deadline.emit("parse", {"command": result})
+            dispatch_result = action_handlers.dispatch_action(result, deadline)
+            return _with_degradation({
                 "response": dispatch_result,
                 "claude_output": result
-            })
+            }, deadline), 200
 
         except Exception as e:
-            return jsonify({"response": f"Unexpected error: {str(e)}"}), 500
-
+            return {"response": f"Unexpected error: {str(e)}"}, 500
+    
+    @api_bp.route('/execute', methods=['POST'])
+    def execute():
+        """Main command execution endpoint"""
+        data = request.json or {}
+        budget_ms = _latency_budget(data)
+        if budget_ms is None:
+            return jsonify({"success": False, "error": "latency_budget_ms must be a positive integer"}), 400
+        deadline = Deadline(budget_ms)
+        payload, status = run_command(data.get("text", ""), deadline, data.get("session_id"))
+        return jsonify(payload), status
+    
+    @api_bp.route('/prefetch', methods=['POST'])
+    def prefetch():
+        """Accept an interim speech transcript and start speculative work for the final /execute"""
+        data = request.json or {}
+        session_id = data.get("session_id")
+        text = data.get("text", "")
+        if not session_id or not text.strip():
+            return jsonify({"success": False, "error": "session_id and text are required"}), 400
+        if not prefetcher:
+            return jsonify({"success": False, "error": "Prefetching is disabled"}), 404
+        return jsonify(prefetcher.update(session_id, text, bool(data.get("final"))))
+    
+    @api_bp.route('/execute_stream', methods=['POST'])
+    def execute_stream():
+        """Streaming variant of /execute: Server-Sent Events as each stage completes"""
+        data = request.json or {}
+        budget_ms = _latency_budget(data)
+        if budget_ms is None:
+            return jsonify({"success": False, "error": "latency_budget_ms must be a positive integer"}), 400
+        events = queue.Queue()
+        deadline = Deadline(
+            budget_ms,
+            listener=lambda event, payload: events.put((event, payload))
+        )
+        prompt = data.get("text", "")
+        session_id = data.get("session_id")
+        
+        def worker():
+            try:
+                payload, status = run_command(prompt, deadline, session_id)
+                events.put(("done", {**payload, "status": status}))
+            except Exception as e:
+                events.put(("done", {"success": False, "error": str(e), "status": 500}))
+        
+        threading.Thread(target=worker, name="execute-stream", daemon=True).start()
+        
+        def generate():
+            while True:
+                try:
+                    event, payload = events.get(timeout=deadline.remaining() + Config.EXECUTE_STREAM_GRACE_SECONDS)
+                except queue.Empty:
+                    yield _sse("done", {"success": False, "error": "Command did not finish in time", "status": 504})
+                    break
+                yield _sse(event, payload)
+                if event == "done":
+                    break
+        
+        return Response(generate(), mimetype="text/event-stream", headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        })
+    
+    @api_bp.route('/claude_metrics', methods=['GET'])
+    def claude_metrics():
+        """Per-operation Claude tokens, latency histograms, error classes and cache outcomes"""
+        return jsonify(claude_service.get_metrics())
+    
     @api_bp.route('/health', methods=['GET'])
     def health_check():
         """Health check endpoint"""
@@ -160,6 +285,24 @@ def init_api_routes(action_handlers, reminder_service, twilio_service, email_ser
             "scheduler_status": scheduler_status,
             "scheduled_jobs": scheduled_jobs,
             "claude_configured": bool(claude_service.api_key),
+            "claude_connections": claude_service.get_connection_stats(),
+            "twilio_transport": twilio_service.get_transport_stats(),
+            "sms_queue": sms_queue.get_stats() if sms_queue else {"enabled": False},
+            "sms_senders": twilio_service.sender_pool.get_stats(Config.SMS_RATE_PER_NUMBER),
+            "sms_encoding": twilio_service.get_encoding_stats(),
+            "delivery_status": twilio_service.get_delivery_stats(),
+            "local_enhancer": action_handlers.get_local_enhancer_stats(),
+            "enhancement_cache": claude_service.get_cache_stats(),
+            "parse_cache": claude_service.get_parse_cache_stats(),
+            "claude_prompt_cache": claude_service.get_prompt_cache_stats(),
+            "claude_operations": claude_service.get_operation_stats(),
+            "claude_coalescing": claude_service.get_coalescing_stats(),
+            "speculative_parse": speculative_parser.get_stats() if speculative_parser else {"enabled": False},
+            "prefetch": prefetcher.get_stats() if prefetcher else {"enabled": False},
+            "claude_circuit_breaker": claude_service.get_circuit_breaker_stats(),
+            "claude_hedging": claude_service.get_hedging_stats(),
+            "claude_rate_limit": claude_service.get_rate_limit_stats(),
+            "claude_batching": claude_service.get_batching_stats(),
             "features": [
                 "voice_sms", "voice_email", "multi_recipient_sms", 
                 "multi_recipient_email", "mixed_messaging", "message_enhancement", 
@@ -175,12 +318,13 @@ def init_api_routes(action_handlers, reminder_service, twilio_service, email_ser
         to = data.get('to')
         message = data.get('message', 'Test message from Smart AI Agent')
         enhance = data.get('enhance', True)
+        bypass_cache = data.get('bypass_cache', False)
         
         if not to:
             return jsonify({"error": "Phone number 'to' is required"}), 400
         
         if enhance:
-            enhanced_message = claude_service.enhance_message(message)
+            enhanced_message = claude_service.enhance_message(message, use_cache=not bypass_cache)
             result = twilio_service.send_sms(to, enhanced_message)
             result['original_message'] = message
             result['enhanced_message'] = enhanced_message
@@ -197,14 +341,18 @@ def init_api_routes(action_handlers, reminder_service, twilio_service, email_ser
         subject = data.get('subject', '')
         message = data.get('message', 'Test email from Smart AI Agent')
         enhance = data.get('enhance', True)
+        bypass_cache = data.get('bypass_cache', False)
         
         if not to:
             return jsonify({"error": "Email address 'to' is required"}), 400
         
         if enhance:
-            enhanced_message = claude_service.enhance_message(message)
-            if not subject:
-                subject = claude_service.generate_email_subject(enhanced_message)
+            if subject:
+                enhanced_message = claude_service.enhance_message(message, use_cache=not bypass_cache)
+            else:
+                enhanced = claude_service.enhance_email(message, use_cache=not bypass_cache)
+                enhanced_message = enhanced["message"]
+                subject = enhanced["subject"]
             result = email_service.send_email(to, subject, enhanced_message)
             result['original_message'] = message
             result['enhanced_message'] = enhanced_message
@@ -216,6 +364,82 @@ def init_api_routes(action_handlers, reminder_service, twilio_service, email_ser
         
         return jsonify(result)
 
+    @api_bp.route('/send_template', methods=['POST'])
+    def send_template():
+        """Personalized broadcast: enhance one template, render it per recipient"""
+        data = request.json
+        template = data.get('template', '')
+        recipients = data.get('recipients', {})
+        channel = data.get('type', 'sms')
+        enhance = data.get('enhance', True)
+        
+        if not template:
+            return jsonify({"error": "'template' is required"}), 400
+        if not isinstance(recipients, dict) or not recipients:
+            return jsonify({"error": "'recipients' must map each recipient to its variables"}), 400
+        
+        if channel == 'email':
+            result = action_handlers.send_emails_to_multiple(
+                list(recipients), data.get('subject', ''), template, enhance=enhance, variables=recipients
+            )
+        else:
+            result = action_handlers.send_sms_to_multiple(list(recipients), template, enhance=enhance, variables=recipients)
+        
+        return jsonify(result)
+
+    @api_bp.route('/sms_status/<ticket_id>', methods=['GET'])
+    def sms_status(ticket_id):
+        """Delivery state of an SMS accepted into the outbound queue"""
+        if not sms_queue:
+            return jsonify({"error": "SMS queue is disabled"}), 404
+        ticket = sms_queue.get_ticket(ticket_id)
+        if ticket is None:
+            return jsonify({"error": f"Unknown ticket {ticket_id}"}), 404
+        return jsonify(ticket)
+    
+    @api_bp.route('/twilio/status', methods=['POST'])
+    def twilio_status_callback():
+        """Twilio status callback: record each delivery status change of a sent SMS"""
+        if not twilio_service.delivery_status:
+            return jsonify({"error": "Delivery status tracking is disabled"}), 404
+        # Twilio signs the exact URL it was given, which may differ from request.url behind a proxy
+        if not twilio_service.validate_callback(Config.TWILIO_STATUS_CALLBACK_URL, request.form.to_dict(),
+                                                request.headers.get('X-Twilio-Signature', '')):
+            return jsonify({"error": "Invalid Twilio signature"}), 403
+        
+        message_sid = request.form.get('MessageSid', '')
+        status = request.form.get('MessageStatus') or request.form.get('SmsStatus', '')
+        if not message_sid or not status:
+            return jsonify({"error": "MessageSid and MessageStatus are required"}), 400
+        
+        result = twilio_service.delivery_status.update(
+            message_sid, status, request.form.get('To'), request.form.get('From'), request.form.get('ErrorCode')
+        )
+        if not result["success"]:
+            return jsonify({"error": result["error"]}), 500
+        return "", 204
+    
+    @api_bp.route('/message_status', methods=['GET'])
+    def message_status():
+        """Delivery status by message SID (comma-separated for several) or by recipient"""
+        if not twilio_service.delivery_status:
+            return jsonify({"error": "Delivery status tracking is disabled"}), 404
+        sids = [sid.strip() for sid in request.args.get('sid', '').split(',') if sid.strip()]
+        recipient = request.args.get('recipient', '')
+        
+        if sids:
+            found = {sid: twilio_service.delivery_status.get(sid) for sid in sids}
+            return jsonify({
+                "messages": [entry for entry in found.values() if entry],
+                "missing": [sid for sid, entry in found.items() if not entry]
+            })
+        if recipient:
+            if is_phone_number(recipient):
+                recipient = format_phone_number(recipient)
+            limit = min(request.args.get('limit', 20, type=int), 200)
+            return jsonify({"recipient": recipient, "messages": twilio_service.delivery_status.by_recipient(recipient, limit)})
+        return jsonify({"error": "Provide 'sid' or 'recipient'"}), 400
+    
     @api_bp.route('/list_reminders', methods=['GET'])
     def list_reminders():
         """List all scheduled reminders"""
@@ -110,15 +110,55 @@ def index():
 
             output.textContent = "Processing with AI...";
 
-            fetch("/execute", {
+            // Stream progress from /execute_stream so each stage shows up as soon as it finishes
+            let enhanced = "";
+            let parsed = "";
+            let sent = "";
+            const render = () => {
+                output.textContent = parsed + (enhanced ? "✨ " + enhanced + "\\n" : "") + sent;
+            };
+            const handleEvent = (event, data) => {
+                if (event === "parse") {
+                    parsed = "🧠 Understood: " + (data.command.action || "command") + "\\n";
+                } else if (event === "token") {
+                    enhanced += data.text;
+                } else if (event === "enhanced") {
+                    enhanced = data.message || "";
+                } else if (event === "result") {
+                    const recipient = data.original_recipient || data.recipient || "recipient";
+                    sent += (data.success ? "✅ " : "❌ ") + recipient + (data.success ? "" : " - " + (data.error || "failed")) + "\\n";
+                } else if (event === "done") {
+                    output.textContent = (data.status === 200 ? "✅ " : "❌ ") + (data.response || "Done!");
+                    input.value = "";
+                    return;
+                }
+                render();
+            };
+
+            fetch("/execute_stream", {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
                 body: JSON.stringify({ text: userText })
             })
-            .then(res => res.json())
-            .then(data => {
-                output.textContent = "✅ " + (data.response || "Done!");
-                input.value = "";
+            .then(async res => {
+                const reader = res.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = "";
+                while (true) {
+                    const { value, done } = await reader.read();
+                    if (done) break;
+                    buffer += decoder.decode(value, { stream: true });
+                    let boundary;
+                    while ((boundary = buffer.indexOf("\\n\\n")) !== -1) {
+                        const frame = buffer.slice(0, boundary);
+                        buffer = buffer.slice(boundary + 2);
+                        const event = (frame.match(/^event: (.*)$/m) || [])[1];
+                        const data = (frame.match(/^data: (.*)$/m) || [])[1];
+                        if (event && data) {
+                            handleEvent(event, JSON.parse(data));
+                        }
+                    }
+                }
             })
             .catch(err => {
                 output.textContent = "❌ Error: " + err.message;
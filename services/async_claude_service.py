@@ -0,0 +1,173 @@
+import asyncio
+import json
+import threading
+from typing import Dict, Any, Optional
+from config import Config
+from services.claude_prompts import (
+    PARSE_INSTRUCTION_PROMPT, build_message_body, extract_text, is_truncated, build_enhance_prompt, build_subject_prompt,
+    build_email_prompt, build_parse_prompt, parse_command_response, parse_email_response
+)
+from utils.formatters import clean_voice_message
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+class AsyncClaudeService:
+    """Asyncio-native Claude client with a global concurrency limit"""
+
+    def __init__(self, api_key: str, base_url: str, max_concurrency: int):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.max_retries = Config.CLAUDE_MAX_RETRIES
+        self.headers = {
+            "x-api-key": api_key,
+            "anthropic-version": "2023-06-01",
+            "content-type": "application/json"
+        }
+        self._client = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._waiting = 0
+        self._retries = 0
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        """Create the pooled client lazily so it binds to the running loop"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=httpx.Timeout(Config.CLAUDE_READ_TIMEOUT, connect=Config.CLAUDE_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                )
+            )
+        return self._client
+
+    async def post(self, url: str, body: Dict[str, Any], timeout: Optional[float] = None) -> "httpx.Response":
+        """POST to the Messages API once a concurrency slot is free; timeout bounds the whole call"""
+        if timeout is None:
+            return await self._post(url, body)
+        try:
+            return await asyncio.wait_for(self._post(url, body), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"no response within {timeout:.2f}s")
+
+    async def _post(self, url: str, body: Dict[str, Any]) -> "httpx.Response":
+        """POST with retries on connection resets"""
+        self._waiting += 1
+        async with self._semaphore:
+            self._waiting -= 1
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+            try:
+                attempt = 0
+                while True:
+                    try:
+                        return await self._get_client().post(url, content=json.dumps(body))
+                    except (httpx.ConnectError, httpx.RemoteProtocolError, httpx.ReadError, httpx.WriteError):
+                        if attempt >= self.max_retries:
+                            raise
+                        attempt += 1
+                        self._retries += 1
+            finally:
+                self._in_flight -= 1
+
+    async def _call_claude(self, prompt: str, operation: str = "enhance", system: Optional[str] = None) -> Dict[str, Any]:
+        """Make API call to Claude using the operation's model and token budget"""
+        settings = Config.CLAUDE_OPERATIONS[operation]
+        try:
+            body = build_message_body(prompt, settings, system)
+
+            response = await self.post(self.base_url, body)
+            response_json = response.json()
+
+            if "content" in response_json:
+                if is_truncated(response_json.get("stop_reason"), settings):
+                    return {"success": False, "truncated": True, "error": f"Claude reply truncated at {settings['max_tokens']} max_tokens"}
+                return {"success": True, "content": extract_text(response_json, settings)}
+            else:
+                return {"success": False, "error": "Claude response missing content"}
+
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    async def enhance_message(self, message: str) -> str:
+        """Enhance a message using Claude AI"""
+        result = await self._call_claude(build_enhance_prompt(message), "enhance")
+        if result["success"]:
+            return result["content"].strip()
+        else:
+            print(f"Message enhancement failed: {result['error']}")
+            return clean_voice_message(message) if result.get("truncated") else message
+
+    async def generate_email_subject(self, message: str) -> str:
+        """Generate email subject using Claude AI"""
+        result = await self._call_claude(build_subject_prompt(message), "subject")
+        if result["success"]:
+            return result["content"].strip() or "Message from Smart AI Agent"
+        else:
+            return "Message from Smart AI Agent"
+
+    async def enhance_email(self, message: str) -> Dict[str, str]:
+        """Enhance an email body and generate its subject in a single Claude call"""
+        result = await self._call_claude(build_email_prompt(message), "email")
+        if result["success"]:
+            parsed = parse_email_response(result["content"])
+            if parsed:
+                return parsed
+        elif result.get("truncated"):
+            cleaned = clean_voice_message(message)
+            return {"message": cleaned, "subject": await self.generate_email_subject(cleaned)}
+
+        enhanced_message = await self.enhance_message(message)
+        return {"message": enhanced_message, "subject": await self.generate_email_subject(enhanced_message)}
+
+    async def parse_command(self, prompt: str) -> Dict[str, Any]:
+        """Parse user command into structured action"""
+        if Config.CLAUDE_PROMPT_CACHE_ENABLED:
+            result = await self._call_claude(prompt, "parse", system=PARSE_INSTRUCTION_PROMPT)
+        else:
+            result = await self._call_claude(build_parse_prompt(prompt), "parse")
+
+        if result["success"]:
+            return parse_command_response(result["content"])
+        else:
+            return {"error": result["error"]}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Report concurrency usage"""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "peak_in_flight": self._peak_in_flight,
+            "waiting": self._waiting,
+            "retries": self._retries
+        }
+
+    async def aclose(self):
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+class AsyncLoopRunner:
+    """Runs an event loop in a daemon thread so synchronous code can await coroutines"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="claude-async-loop", daemon=True)
+        self._thread.start()
+
+    def run(self, coro, timeout: float = None) -> Any:
+        """Block the calling thread until coro finishes on the background loop"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def close(self):
+        """Stop the background loop"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
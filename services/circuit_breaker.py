@@ -0,0 +1,100 @@
+import threading
+import time
+from typing import Dict, Any
+
+class CircuitBreaker:
+    """Stop calling a failing dependency after consecutive failures, probing before trusting it again
+
+    closed: calls go through; failure_threshold consecutive failures open the circuit.
+    open: calls are rejected until reset_timeout seconds have passed.
+    half_open: up to half_open_probes calls go through; one success closes, one failure re-opens.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, half_open_probes: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._stats = {
+            "trips": 0,
+            "rejected": 0,
+            "probes": 0,
+            "successes": 0,
+            "failures": 0
+        }
+
+    def allow_request(self) -> bool:
+        """Whether a call may go through now; a True in half-open state reserves a probe slot"""
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self._stats["rejected"] += 1
+                    return False
+                self._state = self.HALF_OPEN
+                self._probes_in_flight = 0
+                print("[CIRCUIT] Claude circuit half-open, sending probe")
+            if self._state == self.HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_probes:
+                    self._stats["rejected"] += 1
+                    return False
+                self._probes_in_flight += 1
+                self._stats["probes"] += 1
+            return True
+
+    def record_success(self):
+        """A call succeeded; closes a half-open circuit"""
+        with self._lock:
+            self._stats["successes"] += 1
+            self._consecutive_failures = 0
+            if self._state != self.CLOSED:
+                print("[CIRCUIT] Claude circuit closed")
+            self._state = self.CLOSED
+            self._probes_in_flight = 0
+
+    def record_failure(self):
+        """A call failed or timed out; opens the circuit once the threshold is reached"""
+        with self._lock:
+            self._stats["failures"] += 1
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN or (
+                self._state == self.CLOSED and self._consecutive_failures >= self.failure_threshold
+            ):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probes_in_flight = 0
+                self._stats["trips"] += 1
+                print(f"[CIRCUIT] Claude circuit opened after {self._consecutive_failures} consecutive failures")
+
+    def release(self):
+        """A call finished without telling us anything about the dependency's health"""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._probes_in_flight:
+                self._probes_in_flight -= 1
+
+    @property
+    def state(self) -> str:
+        """Current state, moving open to half-open once the reset timeout has passed"""
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Report state, trip count and call outcomes"""
+        state = self.state
+        with self._lock:
+            stats = dict(self._stats)
+            stats["consecutive_failures"] = self._consecutive_failures
+            if self._state == self.OPEN:
+                stats["retry_in_seconds"] = round(max(self.reset_timeout - (time.monotonic() - self._opened_at), 0.0), 1)
+        stats["state"] = state
+        stats["failure_threshold"] = self.failure_threshold
+        return stats
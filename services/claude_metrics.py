@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, Any, Optional
+
+# Upper bounds of the latency histogram buckets; slower calls land in the overflow bucket
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+TOKEN_FIELDS = ("input_tokens", "output_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")
+
+def percentile(sorted_samples: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    return sorted_samples[min(int(len(sorted_samples) * pct), len(sorted_samples) - 1)]
+
+class _OperationMetrics:
+    """Counters for one Claude operation"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = Counter()
+        self.tokens = dict.fromkeys(TOKEN_FIELDS, 0)
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.samples = deque(maxlen=500)
+        self.latency_ms_total = 0.0
+        self.cache = Counter()
+
+class ClaudeMetrics:
+    """In-process registry of tokens, latency, errors and cache outcomes per Claude operation"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations = {}
+        self._started = time.time()
+        self._stop = threading.Event()
+        self._reporter = None
+
+    def _operation(self, operation: str) -> _OperationMetrics:
+        """Get or create the counters for an operation (caller holds the lock)"""
+        metrics = self._operations.get(operation)
+        if metrics is None:
+            metrics = self._operations[operation] = _OperationMetrics()
+        return metrics
+
+    def record_call(self, operation: str, latency_ms: Optional[float] = None, usage: Optional[Dict[str, Any]] = None,
+                    error_class: Optional[str] = None):
+        """Record one Claude call; latency is None when the call never reached the API"""
+        with self._lock:
+            metrics = self._operation(operation)
+            metrics.calls += 1
+            if error_class:
+                metrics.errors[error_class] += 1
+            for field in TOKEN_FIELDS:
+                metrics.tokens[field] += (usage or {}).get(field, 0) or 0
+            if latency_ms is not None:
+                index = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if latency_ms <= bound), len(LATENCY_BUCKETS_MS))
+                metrics.buckets[index] += 1
+                metrics.samples.append(latency_ms)
+                metrics.latency_ms_total += latency_ms
+
+    def record_cache(self, operation: str, outcome: str):
+        """Record a cache outcome (hit, miss, bypass, local, ...) for an operation"""
+        with self._lock:
+            self._operation(operation).cache[outcome] += 1
+
+    def latency_percentile(self, operation: str, pct: float, min_samples: int = 1) -> Optional[float]:
+        """Recent latency percentile in ms, or None with fewer than min_samples samples"""
+        with self._lock:
+            metrics = self._operations.get(operation)
+            samples = sorted(metrics.samples) if metrics else []
+        if not samples or len(samples) < min_samples:
+            return None
+        return percentile(samples, pct)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Per-operation counters, histograms and percentiles plus totals"""
+        operations = {}
+        totals = dict.fromkeys(TOKEN_FIELDS, 0)
+        totals.update(calls=0, errors=0)
+        with self._lock:
+            for operation, metrics in self._operations.items():
+                samples = sorted(metrics.samples)
+                timed = sum(metrics.buckets)
+                # A list keeps bucket order through jsonify's key sorting; le_ms None is the overflow bucket
+                histogram = [{"le_ms": bound, "count": count} for bound, count in zip(LATENCY_BUCKETS_MS + (None,), metrics.buckets)]
+                entry = {
+                    "calls": metrics.calls,
+                    "errors": dict(metrics.errors),
+                    "tokens": dict(metrics.tokens),
+                    "avg_output_tokens": round(metrics.tokens["output_tokens"] / (metrics.calls - sum(metrics.errors.values())), 1)
+                    if metrics.calls > sum(metrics.errors.values()) else None,
+                    "latency_histogram": histogram,
+                    "avg_latency_ms": round(metrics.latency_ms_total / timed, 1) if timed else None,
+                    "cache": dict(metrics.cache)
+                }
+                if samples:
+                    entry["p50_ms"] = round(percentile(samples, 0.5), 1)
+                    entry["p95_ms"] = round(percentile(samples, 0.95), 1)
+                    entry["p99_ms"] = round(percentile(samples, 0.99), 1)
+                    entry["max_ms"] = round(samples[-1], 1)
+                operations[operation] = entry
+
+                totals["calls"] += metrics.calls
+                totals["errors"] += sum(metrics.errors.values())
+                for field in TOKEN_FIELDS:
+                    totals[field] += metrics.tokens[field]
+        return {
+            "since": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self._started)),
+            "uptime_seconds": round(time.time() - self._started),
+            "totals": totals,
+            "operations": operations
+        }
+
+    def summary_line(self) -> str:
+        """One compact log line: calls, errors, tokens and p95 per operation"""
+        parts = []
+        for operation, entry in sorted(self.snapshot()["operations"].items()):
+            parts.append(
+                f"{operation} calls={entry['calls']} err={sum(entry['errors'].values())} "
+                f"in={entry['tokens']['input_tokens']} out={entry['tokens']['output_tokens']} "
+                f"p95={entry.get('p95_ms', '-')}ms"
+            )
+        return " | ".join(parts) or "no Claude calls yet"
+
+    def start_reporter(self, interval_seconds: int):
+        """Print the summary line every interval from a daemon thread"""
+        def report():
+            while not self._stop.wait(interval_seconds):
+                print(f"[CLAUDE METRICS] {self.summary_line()}")
+
+        self._reporter = threading.Thread(target=report, name="claude-metrics-reporter", daemon=True)
+        self._reporter.start()
+
+    def stop(self):
+        """Stop the periodic reporter"""
+        self._stop.set()
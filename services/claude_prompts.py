@@ -0,0 +1,177 @@
+import json
+from typing import Dict, Any, List, Optional
+
+PARSE_INSTRUCTION_PROMPT = """
+        You are an intelligent assistant. Respond ONLY with valid JSON using one of the supported actions.
+
+        Supported actions:
+        - create_task, create_appointment, send_message, send_message_multi
+        - send_email, send_email_multi, schedule_sms_reminder, schedule_email_reminder
+        - log_conversation, enhance_message
+
+        Response structure:
+        {
+          "action": "action_name",
+          "title": "...",
+          "due_date": "YYYY-MM-DDTHH:MM:SS",
+          "reminder_time": "YYYY-MM-DDTHH:MM:SS",
+          "recipient": "Name, phone number, or email",
+          "recipients": ["Name1", "Name2"],
+          "message": "Body of the message",
+          "subject": "Email subject",
+          "notes": "Optional details"
+        }
+
+        Only include fields relevant to the action. Do not add extra commentary.
+        """
+
+def build_message_body(prompt: str, settings: Dict[str, Any], system: Optional[str] = None) -> Dict[str, Any]:
+    """Build a Messages API request body; a system prompt is marked cacheable so its prefix is reused"""
+    body = {
+        "model": settings["model"],
+        "max_tokens": settings["max_tokens"],
+        "temperature": settings["temperature"],
+        "messages": [{"role": "user", "content": prompt}]
+    }
+    if settings.get("stop_sequences"):
+        body["stop_sequences"] = settings["stop_sequences"]
+    if system:
+        body["system"] = [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+    return body
+
+def extract_text(response_json: Dict[str, Any], settings: Dict[str, Any]) -> str:
+    """Return the response text, restoring a stripped stop sequence when the operation needs it"""
+    text = response_json["content"][0]["text"]
+    if settings.get("restore_stop") and response_json.get("stop_reason") == "stop_sequence":
+        text += (response_json.get("stop_sequence") or "").strip()
+    return text
+
+def is_truncated(stop_reason: Optional[str], settings: Dict[str, Any]) -> bool:
+    """Whether a reply hit max_tokens for an operation that cannot use a partial answer"""
+    return bool(settings.get("reject_truncated")) and stop_reason == "max_tokens"
+
+def build_enhance_prompt(message: str) -> str:
+    """Prompt for enhancing a single message"""
+    return f"""
+        You are a professional communication assistant. Enhance this message to be clear,
+        professional, and grammatically correct while preserving the original meaning:
+
+        Original message: "{message}"
+
+        Respond with ONLY the enhanced message, nothing else.
+        """
+
+def build_template_enhance_prompt(template: str) -> str:
+    """Prompt for enhancing a broadcast template without touching its {placeholders}"""
+    return f"""
+        You are a professional communication assistant. Enhance this message template to be clear,
+        professional, and grammatically correct while preserving the original meaning.
+        Words in curly braces such as {{first_name}} are placeholders filled in per recipient:
+        keep every placeholder exactly as written, braces included, and do not add new ones.
+
+        Original template: "{template}"
+
+        Respond with ONLY the enhanced template, nothing else.
+        """
+
+def build_subject_prompt(message: str) -> str:
+    """Prompt for generating an email subject line"""
+    return f"""
+        Generate a professional, concise email subject line for this message content.
+        The subject should be clear, specific, and under 50 characters.
+
+        Message content: "{message}"
+
+        Respond with ONLY the subject line, nothing else.
+        """
+
+def build_shorten_prompt(message: str, max_chars: int) -> str:
+    """Prompt for shortening an SMS to fit its segment budget"""
+    return f"""
+        Shorten this text message to at most {max_chars} characters while keeping its meaning,
+        names, dates, times and numbers. Use plain punctuation only: straight quotes, hyphens, no emoji.
+
+        Original message: "{message}"
+
+        Respond with ONLY the shortened message, nothing else.
+        """
+
+def build_email_prompt(message: str) -> str:
+    """Prompt for enhancing an email body and generating its subject together"""
+    return f"""
+        You are a professional communication assistant. Enhance this email message to be clear,
+        professional, and grammatically correct while preserving the original meaning, then write
+        a professional, concise subject line for it that is under 50 characters.
+
+        Original message: "{message}"
+
+        Respond with ONLY a JSON object of the form {{"message": "enhanced message", "subject": "subject line"}}.
+        """
+
+def build_batch_enhance_prompt(messages: List[str]) -> str:
+    """Prompt for enhancing several independent messages in one request"""
+    items = json.dumps([{"id": i, "message": m} for i, m in enumerate(messages)], ensure_ascii=False)
+    return f"""
+        You are a professional communication assistant. Enhance each of the following independent
+        messages to be clear, professional, and grammatically correct while preserving its original meaning.
+
+        Messages (JSON): {items}
+
+        Respond with ONLY a JSON array containing one object per message, in the same order,
+        of the form {{"id": <id>, "enhanced": "enhanced message"}}.
+        """
+
+def build_parse_prompt(prompt: str) -> str:
+    """Prompt for parsing a user command into a structured action"""
+    return f"{PARSE_INSTRUCTION_PROMPT}\n\nUser: {prompt}"
+
+def parse_command_response(content: str) -> Dict[str, Any]:
+    """Decode the JSON action returned for a parse prompt"""
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        return {"error": "Failed to parse Claude response as JSON"}
+
+def parse_batch_enhance_response(content: str, count: int) -> List[Optional[str]]:
+    """Map a batch response back to its items; missing or malformed entries come back as None"""
+    results = [None] * count
+    start = content.find("[")
+    end = content.rfind("]")
+    if start == -1 or end <= start:
+        return results
+    try:
+        data = json.loads(content[start:end + 1])
+    except json.JSONDecodeError:
+        return results
+    if not isinstance(data, list):
+        return results
+
+    for entry in data:
+        if not isinstance(entry, dict):
+            continue
+        item_id = entry.get("id")
+        enhanced = entry.get("enhanced")
+        if isinstance(item_id, int) and 0 <= item_id < count and isinstance(enhanced, str) and enhanced.strip():
+            results[item_id] = enhanced.strip()
+    return results
+
+def parse_email_response(content: str) -> Dict[str, str]:
+    """Pull the message/subject pair out of a combined response, or return {} if malformed"""
+    start = content.find("{")
+    end = content.rfind("}")
+    if start == -1 or end <= start:
+        return {}
+    try:
+        data = json.loads(content[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+
+    enhanced_message = data.get("message")
+    subject = data.get("subject")
+    if not isinstance(enhanced_message, str) or not isinstance(subject, str):
+        return {}
+    if not enhanced_message.strip() or not subject.strip():
+        return {}
+    return {"message": enhanced_message.strip(), "subject": subject.strip().strip('"')}
@@ -1,108 +1,727 @@
 import requests
 import json
-from typing import Dict, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+from config import Config
+from utils.deadline import Deadline
+from utils.formatters import clean_voice_message
+from services.enhancement_cache import EnhancementCache
+from services.request_coalescer import RequestCoalescer
+from services.circuit_breaker import CircuitBreaker
+from services.rate_limiter import SharedRateLimiter, RateLimitTimeout
+from services.claude_metrics import ClaudeMetrics
+from services.enhancement_batcher import EnhancementBatcher
+from services.parse_cache import ParseTemplateCache
+from services.async_claude_service import AsyncClaudeService, AsyncLoopRunner, HTTPX_AVAILABLE
+from services.claude_prompts import (
+    PARSE_INSTRUCTION_PROMPT, build_message_body, extract_text, is_truncated, build_enhance_prompt, build_subject_prompt,
+    build_email_prompt, build_parse_prompt, build_template_enhance_prompt, build_shorten_prompt, parse_command_response,
+    parse_email_response
+)
+from utils.formatters import template_placeholders
 
 class ClaudeService:
     """Claude AI service for message enhancement and command parsing"""
     
+    DEFAULT_SUBJECT = "Message from Smart AI Agent"
+    # Bump whenever the enhancement prompt changes so cached results are not reused
+    ENHANCE_PROMPT_VERSION = "1"
+    # Same for the combined email prompt; its cache entries live under their own "email:" namespace
+    ENHANCE_EMAIL_PROMPT_VERSION = "1"
+    
     def __init__(self, api_key: str):
         self.api_key = api_key
-        self.base_url = "https://api.anthropic.com/v1/messages"
+        self.base_url = Config.CLAUDE_BASE_URL
         self.headers = {
             "x-api-key": api_key,
             "anthropic-version": "2023-06-01",
             "content-type": "application/json"
         }
+        self.timeout = (Config.CLAUDE_CONNECT_TIMEOUT, Config.CLAUDE_READ_TIMEOUT)
+        self.max_retries = Config.CLAUDE_MAX_RETRIES
+        self._stats_lock = threading.Lock()
+        self._retries = 0
+        self._in_flight = 0
+        self.metrics = ClaudeMetrics()
+        if Config.CLAUDE_METRICS_LOG_INTERVAL > 0:
+            self.metrics.start_reporter(Config.CLAUDE_METRICS_LOG_INTERVAL)
+        self._prompt_cache_usage = {
+            "requests": 0,
+            "cache_hits": 0,
+            "cache_read_input_tokens": 0,
+            "cache_creation_input_tokens": 0,
+            "uncached_input_tokens": 0,
+            "hit_latency_ms_total": 0.0,
+            "miss_latency_ms_total": 0.0
+        }
+        self.session = self._create_session(Config.CLAUDE_POOL_SIZE)
+        self.async_service = None
+        self._async_runner = None
+        if Config.CLAUDE_ASYNC_ENABLED:
+            if HTTPX_AVAILABLE:
+                self.async_service = AsyncClaudeService(api_key, self.base_url, Config.CLAUDE_MAX_CONCURRENCY)
+                self._async_runner = AsyncLoopRunner()
+            else:
+                print("⚠️ CLAUDE_ASYNC_ENABLED is set but httpx is not installed, using blocking transport")
+        self.coalescer = RequestCoalescer() if Config.CLAUDE_COALESCE_ENABLED else None
+        self.circuit_breaker = None
+        if Config.CLAUDE_BREAKER_ENABLED:
+            self.circuit_breaker = CircuitBreaker(
+                Config.CLAUDE_BREAKER_FAILURE_THRESHOLD,
+                Config.CLAUDE_BREAKER_RESET_SECONDS,
+                Config.CLAUDE_BREAKER_HALF_OPEN_PROBES
+            )
+        self.rate_limiter = None
+        if Config.CLAUDE_RATE_LIMIT_ENABLED:
+            self.rate_limiter = SharedRateLimiter(
+                Config.CLAUDE_RATE_LIMIT_PATH,
+                Config.CLAUDE_RATE_LIMIT_RPM,
+                Config.CLAUDE_RATE_LIMIT_TPM
+            )
+        self._hedge_executor = None
+        self._hedge_stats = {"hedged": 0, "hedge_wins": 0}
+        if Config.CLAUDE_HEDGE_ENABLED:
+            self._hedge_executor = ThreadPoolExecutor(max_workers=Config.CLAUDE_POOL_SIZE, thread_name_prefix="claude-hedge")
+        self.batcher = None
+        if Config.CLAUDE_BATCH_ENABLED:
+            self.batcher = EnhancementBatcher(
+                lambda prompt: self._call_claude(prompt, "batch_enhance"),
+                Config.CLAUDE_BATCH_WINDOW_MS,
+                Config.CLAUDE_BATCH_MAX_ITEMS
+            )
+        self.parse_cache = None
+        if Config.PARSE_CACHE_ENABLED:
+            self.parse_cache = ParseTemplateCache(Config.PARSE_CACHE_MAX_ENTRIES, Config.PARSE_CACHE_TTL)
+        self.enhancement_cache = None
+        if Config.ENHANCE_CACHE_ENABLED:
+            self.enhancement_cache = EnhancementCache(
+                Config.ENHANCE_CACHE_PATH,
+                Config.ENHANCE_CACHE_TTL,
+                Config.ENHANCE_CACHE_MAX_ENTRIES,
+                Config.ENHANCE_CACHE_MEMORY_ENTRIES
+            )
+    
+    def _create_session(self, pool_size: int) -> requests.Session:
+        """Create a keep-alive session whose pool matches the worker thread count"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=False)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(self.headers)
+        return session
+    
+    def _post(self, body: Dict[str, Any], timeout: Optional[float] = None) -> requests.Response:
+        """POST to the Messages API, retrying when a pooled connection was reset"""
+        if self.async_service:
+            return self._async_runner.run(self.async_service.post(self.base_url, body, timeout))
+        
+        request_timeout = self.timeout
+        if timeout is not None:
+            request_timeout = (min(Config.CLAUDE_CONNECT_TIMEOUT, timeout), min(Config.CLAUDE_READ_TIMEOUT, timeout))
+        
+        attempt = 0
+        while True:
+            try:
+                return self.session.post(self.base_url, data=json.dumps(body), timeout=request_timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError):
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                with self._stats_lock:
+                    self._retries += 1
+    
+    def _hedge_delay(self, operation: str) -> Optional[float]:
+        """Seconds to wait before hedging: the operation's recent p95, once enough samples exist"""
+        p95 = self.metrics.latency_percentile(operation, 0.95, Config.CLAUDE_HEDGE_MIN_SAMPLES)
+        return None if p95 is None else p95 / 1000.0
+    
+    def _post_hedged(self, body: Dict[str, Any], operation: str, timeout: Optional[float] = None):
+        """POST, firing a second identical request if the first is slower than p95; first success wins"""
+        delay = self._hedge_delay(operation) if self._hedge_executor else None
+        if delay is None or (timeout is not None and delay >= timeout):
+            return self._post(body, timeout)
+        
+        first = self._hedge_executor.submit(self._post, body, timeout)
+        try:
+            return first.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+        
+        second = self._hedge_executor.submit(self._post, body, None if timeout is None else timeout - delay)
+        with self._stats_lock:
+            self._hedge_stats["hedged"] += 1
+        
+        # The slower request cannot be cancelled mid-flight; its response is simply ignored
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        with self._stats_lock:
+                            self._hedge_stats["hedge_wins"] += 1
+                    return future.result()
+                error = future.exception()
+        raise error
     
-    def _call_claude(self, prompt: str, temperature: float = 0.3) -> Dict[str, Any]:
-        """Make API call to Claude"""
+    @staticmethod
+    def _estimate_tokens(body: Dict[str, Any]) -> int:
+        """Rough pre-call token cost: ~4 characters per input token plus the full output budget"""
+        return len(json.dumps(body)) // 4 + body.get("max_tokens", 0)
+    
+    @staticmethod
+    def _retry_after(response) -> float:
+        """Seconds the API asked us to wait after a 429"""
         try:
-            body = {
-                "model": "claude-3-haiku-20240307",
-                "max_tokens": 1000,
-                "temperature": temperature,
-                "messages": [{"role": "user", "content": prompt}]
+            return float(response.headers.get("retry-after", 1))
+        except (TypeError, ValueError):
+            return 1.0
+    
+    def _settle_tokens(self, estimated: int, usage: Dict[str, Any]):
+        """Correct the shared token bucket with the usage the API reported"""
+        actual = sum(usage.get(field, 0) or 0 for field in ("input_tokens", "output_tokens", "cache_creation_input_tokens"))
+        self.rate_limiter.settle(estimated, actual)
+    
+    def _post_with_budget(self, body: Dict[str, Any], operation: str, timeout: Optional[float] = None):
+        """POST once the shared rate limit allows it, waiting out one 429 retry-after before giving up"""
+        if not self.rate_limiter:
+            return self._post_hedged(body, operation, timeout)
+        
+        estimated = self._estimate_tokens(body)
+        max_wait = Config.CLAUDE_RATE_LIMIT_MAX_WAIT if timeout is None else min(Config.CLAUDE_RATE_LIMIT_MAX_WAIT, timeout)
+        started = time.monotonic()
+        for attempt in range(2):
+            self.rate_limiter.acquire(estimated, max_wait - (time.monotonic() - started))
+            remaining = None if timeout is None else timeout - (time.monotonic() - started)
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError("latency budget exhausted waiting for rate limit")
+            response = self._post_hedged(body, operation, remaining)
+            if response.status_code != 429:
+                break
+            # A rejected request consumed nothing; every worker backs off until retry-after
+            self.rate_limiter.settle(estimated, 0)
+            self.rate_limiter.pause(self._retry_after(response))
+            if attempt:
+                return response
+        
+        try:
+            self._settle_tokens(estimated, response.json().get("usage", {}))
+        except ValueError:
+            pass
+        return response
+    
+    def get_connection_stats(self) -> Dict[str, Any]:
+        """Report how many requests reused an already-open connection"""
+        requests_sent = 0
+        connections_opened = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                requests_sent += pool.num_requests
+                connections_opened += pool.num_connections
+        
+        reused = max(requests_sent - connections_opened, 0)
+        stats = {
+            "transport": "async" if self.async_service else "sync",
+            "pool_size": Config.CLAUDE_POOL_SIZE,
+            "requests": requests_sent,
+            "connections_opened": connections_opened,
+            "connections_reused": reused,
+            "reuse_ratio": round(reused / requests_sent, 3) if requests_sent else 0.0,
+            "retries": self._retries
+        }
+        if self.async_service:
+            stats["async"] = self.async_service.get_stats()
+        return stats
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Report enhancement cache counters"""
+        if not self.enhancement_cache:
+            return {"enabled": False}
+        return {"enabled": True, **self.enhancement_cache.get_stats()}
+    
+    def get_parse_cache_stats(self) -> Dict[str, Any]:
+        """Report parse template cache counters"""
+        if not self.parse_cache:
+            return {"enabled": False}
+        return {"enabled": True, **self.parse_cache.get_stats()}
+    
+    def get_operation_stats(self) -> Dict[str, Any]:
+        """Report configured budgets and recent latency percentiles per operation"""
+        measured = self.metrics.snapshot()["operations"]
+        stats = {}
+        for operation, settings in Config.CLAUDE_OPERATIONS.items():
+            entry = {
+                "model": settings["model"],
+                "max_tokens": settings["max_tokens"],
+                "temperature": settings["temperature"],
+                "stop_sequences": settings["stop_sequences"]
             }
+            for field in ("p50_ms", "p95_ms", "max_ms"):
+                if field in measured.get(operation, {}):
+                    entry[field] = measured[operation][field]
+            stats[operation] = entry
+        return stats
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Report tokens, latency histograms, error classes and cache outcomes per operation"""
+        return self.metrics.snapshot()
+    
+    def _record_prompt_cache_usage(self, usage: Dict[str, Any], latency_ms: float):
+        """Track cache reads/writes reported for requests that carry a cacheable system prompt"""
+        cache_read = usage.get("cache_read_input_tokens", 0) or 0
+        cache_creation = usage.get("cache_creation_input_tokens", 0) or 0
+        with self._stats_lock:
+            stats = self._prompt_cache_usage
+            stats["requests"] += 1
+            stats["cache_read_input_tokens"] += cache_read
+            stats["cache_creation_input_tokens"] += cache_creation
+            stats["uncached_input_tokens"] += usage.get("input_tokens", 0) or 0
+            if cache_read:
+                stats["cache_hits"] += 1
+                stats["hit_latency_ms_total"] += latency_ms
+            else:
+                stats["miss_latency_ms_total"] += latency_ms
+    
+    def get_prompt_cache_stats(self) -> Dict[str, Any]:
+        """Report Anthropic prompt-cache usage for the parse instruction prompt"""
+        with self._stats_lock:
+            stats = dict(self._prompt_cache_usage)
+        hits = stats["cache_hits"]
+        misses = stats["requests"] - hits
+        hit_latency = stats.pop("hit_latency_ms_total")
+        miss_latency = stats.pop("miss_latency_ms_total")
+        stats["avg_hit_latency_ms"] = round(hit_latency / hits, 1) if hits else None
+        stats["avg_miss_latency_ms"] = round(miss_latency / misses, 1) if misses else None
+        return stats
+    
+    def get_coalescing_stats(self) -> Dict[str, Any]:
+        """Report how many Claude calls were collapsed onto an in-flight request"""
+        if not self.coalescer:
+            return {"enabled": False}
+        return {"enabled": True, **self.coalescer.get_stats()}
+    
+    def get_circuit_breaker_stats(self) -> Dict[str, Any]:
+        """Report circuit state and trip count"""
+        if not self.circuit_breaker:
+            return {"enabled": False}
+        return {"enabled": True, **self.circuit_breaker.get_stats()}
+    
+    def get_rate_limit_stats(self) -> Dict[str, Any]:
+        """Report shared rate-limit budgets and queueing"""
+        if not self.rate_limiter:
+            return {"enabled": False}
+        return {"enabled": True, **self.rate_limiter.get_stats()}
+    
+    def get_hedging_stats(self) -> Dict[str, Any]:
+        """Report how often a hedge request was fired and how often it won"""
+        if not self._hedge_executor:
+            return {"enabled": False}
+        with self._stats_lock:
+            stats = dict(self._hedge_stats)
+        return {"enabled": True, **stats}
+    
+    def get_batching_stats(self) -> Dict[str, Any]:
+        """Report micro-batching counters"""
+        if not self.batcher:
+            return {"enabled": False}
+        return {"enabled": True, **self.batcher.get_stats()}
+    
+    def close(self):
+        """Close pooled connections and the enhancement cache"""
+        self.metrics.stop()
+        self.session.close()
+        if self._hedge_executor:
+            self._hedge_executor.shutdown(wait=False)
+        if self.async_service:
+            self._async_runner.run(self.async_service.aclose())
+            self._async_runner.close()
+        if self.enhancement_cache:
+            self.enhancement_cache.close()
+        if self.rate_limiter:
+            self.rate_limiter.close()
+    
+    @property
+    def in_flight(self) -> int:
+        """Number of Claude requests currently waiting on the API"""
+        return self._in_flight
+    
+    def _call_claude(self, prompt: str, operation: str = "enhance", deadline: Optional[Deadline] = None,
+                     system: Optional[str] = None) -> Dict[str, Any]:
+        """Make API call to Claude, sharing one request among identical concurrent callers"""
+        timeout = None
+        if deadline:
+            if deadline.expired():
+                self.metrics.record_call(operation, error_class="budget_exhausted")
+                return {"success": False, "degraded": True, "error": "latency budget exhausted"}
+            if self._in_flight >= Config.CLAUDE_MAX_QUEUE_DEPTH:
+                self.metrics.record_call(operation, error_class="queue_full")
+                return {"success": False, "degraded": True, "error": f"Claude queue too deep ({self._in_flight} in flight)"}
+            timeout = deadline.remaining()
+        
+        if not self.coalescer:
+            return self._send_to_claude(prompt, operation, timeout, system)
+        
+        key = (operation, system, prompt)
+        try:
+            return dict(self.coalescer.do(key, lambda: self._send_to_claude(prompt, operation, timeout, system), timeout))
+        except TimeoutError:
+            self.metrics.record_call(operation, error_class="budget_exhausted")
+            return {"success": False, "degraded": True, "error": "latency budget exhausted"}
+    
+    @staticmethod
+    def _error_class(error: Exception) -> str:
+        """Short label for a failed call, used in metrics"""
+        if isinstance(error, RateLimitTimeout):
+            return "rate_limited"
+        if isinstance(error, (requests.exceptions.Timeout, TimeoutError)):
+            return "timeout"
+        if isinstance(error, requests.exceptions.ConnectionError):
+            return "connection"
+        return type(error).__name__
+    
+    def _budget_timeout(self, operation: str, timeout: Optional[float]) -> bool:
+        """Whether a timeout only reflects a leftover budget too small for the call to have finished
 
-            response = requests.post(self.base_url, headers=self.headers, data=json.dumps(body))
+        Such timeouts say nothing about API health: a few requests with tiny budgets must not open the breaker for
+        everyone. A call given at least the operation's p95 (capped at CLAUDE_BREAKER_MIN_BUDGET_MS, since timeouts
+        themselves push the p95 up during an outage) counts as a real failure.
+        """
+        if timeout is None:
+            return False
+        p95 = self.metrics.latency_percentile(operation, 0.95)
+        expected_ms = min(p95, Config.CLAUDE_BREAKER_MIN_BUDGET_MS) if p95 is not None else Config.CLAUDE_BREAKER_MIN_BUDGET_MS
+        return timeout * 1000 < expected_ms
+    
+    def _finish_call(self, operation: str, started: Optional[float], healthy: Optional[bool],
+                     usage: Optional[Dict[str, Any]], error_class: Optional[str]):
+        """Release the in-flight slot and report the outcome to the circuit breaker and metrics"""
+        with self._stats_lock:
+            self._in_flight -= 1
+        if self.circuit_breaker:
+            if healthy is None:
+                self.circuit_breaker.release()
+            elif healthy:
+                self.circuit_breaker.record_success()
+            else:
+                self.circuit_breaker.record_failure()
+        latency_ms = (time.monotonic() - started) * 1000 if started is not None else None
+        self.metrics.record_call(operation, latency_ms, usage, error_class)
+    
+    def _send_to_claude(self, prompt: str, operation: str, timeout: Optional[float] = None,
+                        system: Optional[str] = None) -> Dict[str, Any]:
+        """Send a single Messages API request using the operation's model and token budget"""
+        if self.circuit_breaker and not self.circuit_breaker.allow_request():
+            self.metrics.record_call(operation, error_class="circuit_open")
+            return {"success": False, "degraded": True, "error": "Claude circuit open"}
+        
+        settings = Config.CLAUDE_OPERATIONS[operation]
+        # True/False feed the circuit breaker; None means the outcome says nothing about API health
+        healthy = False
+        started = usage = error_class = None
+        with self._stats_lock:
+            self._in_flight += 1
+        try:
+            body = build_message_body(prompt, settings, system)
+            
+            started = time.monotonic()
+            response = self._post_with_budget(body, operation, timeout)
             response_json = response.json()
+            latency_ms = (time.monotonic() - started) * 1000
             
             if "content" in response_json:
-                return {"success": True, "content": response_json["content"][0]["text"]}
+                healthy = True
+                usage = response_json.get("usage", {})
+                if system:
+                    self._record_prompt_cache_usage(usage, latency_ms)
+                    self.metrics.record_cache(operation, "prompt_cache_read" if usage.get("cache_read_input_tokens") else "prompt_cache_write")
+                if is_truncated(response_json.get("stop_reason"), settings):
+                    error_class = "max_tokens"
+                    return {"success": False, "truncated": True, "error": f"Claude reply truncated at {settings['max_tokens']} max_tokens"}
+                return {"success": True, "content": extract_text(response_json, settings), "usage": usage, "latency_ms": latency_ms}
             else:
+                error_class = f"http_{response.status_code}"
+                if response.status_code < 500 and response.status_code != 429:
+                    healthy = None
                 return {"success": False, "error": "Claude response missing content"}
+        
+        except RateLimitTimeout as e:
+            healthy = None
+            error_class = self._error_class(e)
+            return {"success": False, "degraded": True, "error": str(e)}
+        except (requests.exceptions.Timeout, TimeoutError) as e:
+            error_class = self._error_class(e)
+            if self._budget_timeout(operation, timeout):
+                healthy = None
+            return {"success": False, "degraded": timeout is not None, "error": f"Claude request timed out: {e}"}
+        except Exception as e:
+            error_class = self._error_class(e)
+            return {"success": False, "error": str(e)}
+        finally:
+            self._finish_call(operation, started, healthy, usage, error_class)
+    
+    def _stream_claude(self, prompt: str, operation: str, deadline: Deadline) -> Dict[str, Any]:
+        """Stream a Messages API response, forwarding each text delta to the request's listener"""
+        if deadline.expired():
+            self.metrics.record_call(operation, error_class="budget_exhausted")
+            return {"success": False, "degraded": True, "error": "latency budget exhausted"}
+        if self.circuit_breaker and not self.circuit_breaker.allow_request():
+            self.metrics.record_call(operation, error_class="circuit_open")
+            return {"success": False, "degraded": True, "error": "Claude circuit open"}
+        
+        settings = Config.CLAUDE_OPERATIONS[operation]
+        timeout = deadline.remaining()
+        healthy = False
+        started = usage = error_class = None
+        with self._stats_lock:
+            self._in_flight += 1
+        try:
+            body = build_message_body(prompt, settings)
+            body["stream"] = True
+            
+            estimated = 0
+            if self.rate_limiter:
+                estimated = self._estimate_tokens(body)
+                self.rate_limiter.acquire(estimated, min(Config.CLAUDE_RATE_LIMIT_MAX_WAIT, deadline.remaining()))
+                timeout = deadline.remaining()
+                if timeout <= 0:
+                    raise TimeoutError("latency budget exhausted waiting for rate limit")
+            
+            started = time.monotonic()
+            response = self.session.post(
+                self.base_url,
+                data=json.dumps(body),
+                timeout=(min(Config.CLAUDE_CONNECT_TIMEOUT, timeout), min(Config.CLAUDE_READ_TIMEOUT, timeout)),
+                stream=True
+            )
+            with response:
+                if response.status_code != 200:
+                    if self.rate_limiter:
+                        self.rate_limiter.settle(estimated, 0)
+                        if response.status_code == 429:
+                            self.rate_limiter.pause(self._retry_after(response))
+                    error_class = f"http_{response.status_code}"
+                    if response.status_code < 500 and response.status_code != 429:
+                        healthy = None
+                    return {"success": False, "error": f"Claude streaming request failed with status {response.status_code}"}
                 
+                parts = []
+                usage = {}
+                stop_reason = None
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    event = json.loads(line[5:])
+                    if event.get("type") == "content_block_delta" and event["delta"].get("type") == "text_delta":
+                        parts.append(event["delta"]["text"])
+                        deadline.emit("token", {"text": event["delta"]["text"]})
+                    elif event.get("type") == "message_start":
+                        usage = event["message"].get("usage", {})
+                    elif event.get("type") == "message_delta":
+                        usage.update(event.get("usage", {}))
+                        stop_reason = event.get("delta", {}).get("stop_reason") or stop_reason
+                    elif event.get("type") == "error":
+                        error_class = "stream_error"
+                        return {"success": False, "error": event["error"].get("message", "Claude stream error")}
+                    if deadline.expired():
+                        raise TimeoutError("latency budget exhausted mid-stream")
+            
+            latency_ms = (time.monotonic() - started) * 1000
+            if self.rate_limiter:
+                self._settle_tokens(estimated, usage)
+            healthy = True
+            if is_truncated(stop_reason, settings):
+                error_class = "max_tokens"
+                return {"success": False, "truncated": True, "error": f"Claude reply truncated at {settings['max_tokens']} max_tokens"}
+            return {"success": True, "content": "".join(parts), "usage": usage, "latency_ms": latency_ms}
+        
+        except RateLimitTimeout as e:
+            healthy = None
+            error_class = self._error_class(e)
+            return {"success": False, "degraded": True, "error": str(e)}
+        except (requests.exceptions.Timeout, TimeoutError) as e:
+            error_class = self._error_class(e)
+            if self._budget_timeout(operation, timeout):
+                healthy = None
+            return {"success": False, "degraded": True, "error": f"Claude request timed out: {e}"}
         except Exception as e:
+            error_class = self._error_class(e)
             return {"success": False, "error": str(e)}
+        finally:
+            self._finish_call(operation, started, healthy, usage, error_class)
+    
+    def _batch_fits(self, deadline: Optional[Deadline]) -> bool:
+        """Whether an enhancement can wait for the batch window and still finish within its deadline"""
+        if not self.batcher:
+            return False
+        if deadline is None:
+            return True
+        # Streaming requests want tokens as they arrive, not a batched reply
+        if deadline.listener and Config.CLAUDE_STREAMING_ENABLED:
+            return False
+        # A cold process has no samples yet; start from the configured estimate
+        expected_ms = (self.metrics.latency_percentile("batch_enhance", 0.95)
+                       or self.metrics.latency_percentile("enhance", 0.95)
+                       or Config.CLAUDE_BATCH_EXPECTED_LATENCY_MS)
+        return deadline.remaining() * 1000 > Config.CLAUDE_BATCH_WINDOW_MS + expected_ms
     
-    def enhance_message(self, message: str) -> str:
+    def enhance_message(self, message: str, use_cache: bool = True, deadline: Optional[Deadline] = None) -> str:
         """Enhance a message using Claude AI"""
-        prompt = f"""
-        You are a professional communication assistant. Enhance this message to be clear, 
-        professional, and grammatically correct while preserving the original meaning:
-        
-        Original message: "{message}"
+        cache_key = None
+        if self.enhancement_cache:
+            if use_cache:
+                cache_key = EnhancementCache.make_key(message, self.ENHANCE_PROMPT_VERSION, Config.CLAUDE_OPERATIONS["enhance"]["model"])
+                cached = self.enhancement_cache.get(cache_key)
+                if cached is not None:
+                    self.metrics.record_cache("enhance", "hit")
+                    return cached
+                self.metrics.record_cache("enhance", "miss")
+            else:
+                self.enhancement_cache.record_bypass()
+                self.metrics.record_cache("enhance", "bypass")
         
-        Respond with ONLY the enhanced message, nothing else.
-        """
+        if self._batch_fits(deadline):
+            enhanced = self.batcher.submit(message, timeout=deadline.remaining() if deadline else None)
+            if enhanced is not None:
+                if cache_key:
+                    self.enhancement_cache.set(cache_key, enhanced)
+                return enhanced
         
-        result = self._call_claude(prompt)
+        # Streaming requests get the enhancement token by token instead of after the whole call
+        if deadline and deadline.listener and Config.CLAUDE_STREAMING_ENABLED:
+            result = self._stream_claude(build_enhance_prompt(message), "enhance", deadline)
+        else:
+            result = self._call_claude(build_enhance_prompt(message), "enhance", deadline)
         if result["success"]:
-            return result["content"].strip()
+            enhanced = result["content"].strip()
+            if cache_key:
+                self.enhancement_cache.set(cache_key, enhanced)
+            return enhanced
+        elif result.get("degraded") and deadline:
+            deadline.record_degradation("enhance", result["error"])
+            return clean_voice_message(message)
+        elif result.get("truncated"):
+            print(f"Message enhancement failed: {result['error']}")
+            return clean_voice_message(message)
         else:
             print(f"Message enhancement failed: {result['error']}")
             return message
     
-    def generate_email_subject(self, message: str) -> str:
-        """Generate email subject using Claude AI"""
-        prompt = f"""
-        Generate a professional, concise email subject line for this message content. 
-        The subject should be clear, specific, and under 50 characters.
-        
-        Message content: "{message}"
+    def enhance_template(self, template: str, use_cache: bool = True, deadline: Optional[Deadline] = None) -> str:
+        """Enhance a broadcast template once, keeping its {placeholders}; returns the template unchanged on failure"""
+        cache_key = None
+        if self.enhancement_cache and use_cache:
+            cache_key = EnhancementCache.make_key(
+                template, f"template-{self.ENHANCE_PROMPT_VERSION}", Config.CLAUDE_OPERATIONS["enhance"]["model"]
+            )
+            cached = self.enhancement_cache.get(cache_key)
+            if cached is not None:
+                self.metrics.record_cache("template", "hit")
+                return cached
+            self.metrics.record_cache("template", "miss")
         
-        Respond with ONLY the subject line, nothing else.
-        """
+        result = self._call_claude(build_template_enhance_prompt(template), "enhance", deadline)
+        if result["success"]:
+            enhanced = result["content"].strip().strip('"')
+            # A dropped or invented placeholder would send wrong text to every recipient
+            if template_placeholders(enhanced) == template_placeholders(template):
+                if cache_key:
+                    self.enhancement_cache.set(cache_key, enhanced)
+                return enhanced
+            print(f"Template enhancement changed the placeholders, using the original: {enhanced}")
+        elif result.get("degraded") and deadline:
+            deadline.record_degradation("enhance_template", result["error"])
+        else:
+            print(f"Template enhancement failed: {result['error']}")
+        return clean_voice_message(template)
+    
+    def generate_email_subject(self, message: str, deadline: Optional[Deadline] = None) -> str:
+        """Generate email subject using Claude AI"""
+        result = self._call_claude(build_subject_prompt(message), "subject", deadline)
+        if result["success"]:
+            return result["content"].strip() or self.DEFAULT_SUBJECT
+        else:
+            if result.get("degraded") and deadline:
+                deadline.record_degradation("subject", result["error"])
+            return self.DEFAULT_SUBJECT
+    
+    def shorten_sms(self, message: str, max_chars: int, deadline: Optional[Deadline] = None) -> str:
+        """Ask Claude for a version of an SMS within max_chars; returns the message unchanged on failure"""
+        result = self._call_claude(build_shorten_prompt(message, max_chars), "shorten", deadline)
+        if result["success"]:
+            return result["content"].strip().strip('"') or message
+        if result.get("degraded") and deadline:
+            deadline.record_degradation("shorten", result["error"])
+        else:
+            print(f"SMS shortening failed: {result['error']}")
+        return message
+    
+    def enhance_email(self, message: str, use_cache: bool = True, deadline: Optional[Deadline] = None) -> Dict[str, str]:
+        """Enhance an email body and generate its subject in a single Claude call"""
+        cache_key = None
+        if self.enhancement_cache:
+            if use_cache:
+                cache_key = EnhancementCache.make_key(
+                    message, f"email:{self.ENHANCE_EMAIL_PROMPT_VERSION}", Config.CLAUDE_OPERATIONS["email"]["model"]
+                )
+                cached = self.enhancement_cache.get(cache_key)
+                if cached is not None:
+                    self.metrics.record_cache("email", "hit")
+                    return {"message": cached, "subject": self.generate_email_subject(cached, deadline)}
+                self.metrics.record_cache("email", "miss")
+            else:
+                self.enhancement_cache.record_bypass()
+                self.metrics.record_cache("email", "bypass")
         
-        result = self._call_claude(prompt)
+        result = self._call_claude(build_email_prompt(message), "email", deadline)
         if result["success"]:
-            return result["content"].strip()
+            parsed = parse_email_response(result["content"])
+            if parsed:
+                if cache_key:
+                    self.enhancement_cache.set(cache_key, parsed["message"])
+                return parsed
+            print("Combined email enhancement returned unparseable output, falling back to separate calls")
+        elif result.get("degraded") and deadline:
+            deadline.record_degradation("enhance_email", result["error"])
+            return {"message": clean_voice_message(message), "subject": self.DEFAULT_SUBJECT}
+        elif result.get("truncated"):
+            print(f"Combined email enhancement failed: {result['error']}")
+            cleaned = clean_voice_message(message)
+            return {"message": cleaned, "subject": self.generate_email_subject(cleaned, deadline)}
         else:
-            return "Message from Smart AI Agent"
+            print(f"Combined email enhancement failed: {result['error']}")
+        
+        enhanced_message = self.enhance_message(message, use_cache=use_cache, deadline=deadline)
+        return {"message": enhanced_message, "subject": self.generate_email_subject(enhanced_message, deadline)}
     
     def parse_command(self, prompt: str) -> Dict[str, Any]:
         """Parse user command into structured action"""
-        instruction_prompt = """
-        You are an intelligent assistant. Respond ONLY with valid JSON using one of the supported actions.
-
-        Supported actions:
-        - create_task, create_appointment, send_message, send_message_multi
-        - send_email, send_email_multi, schedule_sms_reminder, schedule_email_reminder
-        - log_conversation, enhance_message
-
-        Response structure:
-        {
-          "action": "action_name",
-          "title": "...",
-          "due_date": "YYYY-MM-DDTHH:MM:SS",
-          "reminder_time": "YYYY-MM-DDTHH:MM:SS",
-          "recipient": "Name, phone number, or email",
-          "recipients": ["Name1", "Name2"],
-          "message": "Body of the message",
-          "subject": "Email subject",
-          "notes": "Optional details"
-        }
-
-        Only include fields relevant to the action. Do not add extra commentary.
-        """
+        template = slots = None
+        if self.parse_cache:
+            template, slots = ParseTemplateCache.abstract(prompt)
+            cached = self.parse_cache.get(template, slots)
+            if cached is not None:
+                print(f"[PARSE CACHE] Hit for template: {template}")
+                self.metrics.record_cache("parse", "hit")
+                return cached
+            self.metrics.record_cache("parse", "miss")
         
-        full_prompt = f"{instruction_prompt}\n\nUser: {prompt}"
-        result = self._call_claude(full_prompt)
+        if Config.CLAUDE_PROMPT_CACHE_ENABLED:
+            result = self._call_claude(prompt, "parse", system=PARSE_INSTRUCTION_PROMPT)
+        else:
+            result = self._call_claude(build_parse_prompt(prompt), "parse")
         
         if result["success"]:
-            try:
-                return json.loads(result["content"])
-            except json.JSONDecodeError:
-                return {"error": "Failed to parse Claude response as JSON"}
+            parsed = parse_command_response(result["content"])
+            if self.parse_cache and isinstance(parsed, dict) and "error" not in parsed:
+                self.parse_cache.store(template, slots, parsed)
+            return parsed
         else:
             return {"error": result["error"]}
\ No newline at end of file
@@ -0,0 +1,201 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+# Twilio message lifecycle; callbacks can arrive out of order, so a status never moves to a lower rank
+STATUS_RANK = {
+    "accepted": 0, "scheduled": 0, "queued": 1, "sending": 2, "sent": 3,
+    "delivered": 4, "undelivered": 4, "failed": 4, "canceled": 4, "read": 5
+}
+FINAL_STATUSES = {"delivered", "undelivered", "failed", "canceled", "read"}
+
+class DeliveryStatusStore:
+    """Delivery status of sent SMS from Twilio status callbacks: SQLite indexed by SID and recipient, recent finals in memory
+
+    Callbacks may land on any worker process, so only final statuses (which never change again) are served
+    from the memory tier; anything still in flight is read from SQLite.
+    """
+
+    def __init__(self, db_path: str, memory_entries: int, retention_seconds: int):
+        self.db_path = db_path
+        self.memory_entries = memory_entries
+        self.retention_seconds = retention_seconds
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._stats = {
+            "sends_recorded": 0,
+            "callbacks": 0,
+            "out_of_order": 0,
+            "memory_hits": 0,
+            "disk_reads": 0,
+            "pruned": 0,
+            "errors": 0
+        }
+        self._setup_database()
+
+    def _setup_database(self):
+        """Open the shared status table (WAL so the callback and query workers do not block each other)"""
+        try:
+            self._conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS message_status ("
+                "message_sid TEXT PRIMARY KEY, recipient TEXT, sender TEXT, status TEXT NOT NULL, "
+                "error_code TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_message_status_recipient ON message_status(recipient, created_at)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_message_status_created ON message_status(created_at)")
+            self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ Delivery status kept in memory only, SQLite unavailable: {e}")
+            self._conn = None
+
+    def _remember(self, entry: Dict[str, Any]):
+        """Keep a final status in the memory tier, evicting the oldest (caller holds the lock)"""
+        if entry["status"] not in FINAL_STATUSES and self._conn is not None:
+            self._memory.pop(entry["message_sid"], None)
+            return
+        self._memory[entry["message_sid"]] = entry
+        self._memory.move_to_end(entry["message_sid"])
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _read(self, message_sid: str) -> Optional[Dict[str, Any]]:
+        """Row for one SID (caller holds the lock)"""
+        entry = self._memory.get(message_sid)
+        if entry is not None:
+            self._stats["memory_hits"] += 1
+            return dict(entry)
+        if self._conn is None:
+            return None
+        self._stats["disk_reads"] += 1
+        row = self._conn.execute("SELECT * FROM message_status WHERE message_sid = ?", (message_sid,)).fetchone()
+        return dict(row) if row else None
+
+    def _write(self, entry: Dict[str, Any]):
+        """Upsert one row and drop rows past the retention window, inside the caller's transaction"""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO message_status "
+            "(message_sid, recipient, sender, status, error_code, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (entry["message_sid"], entry["recipient"], entry["sender"], entry["status"], entry["error_code"],
+             entry["created_at"], entry["updated_at"])
+        )
+        cursor = self._conn.execute("DELETE FROM message_status WHERE created_at < ?",
+                                    (time.time() - self.retention_seconds,))
+        self._stats["pruned"] += max(cursor.rowcount, 0)
+
+    def _merge(self, current: Optional[Dict[str, Any]], message_sid: str, status: str, recipient: Optional[str],
+               sender: Optional[str], error_code: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Row after applying a status, or None when it would move the message backwards"""
+        if current and STATUS_RANK.get(status, 0) < STATUS_RANK.get(current["status"], 0):
+            return None
+        now = time.time()
+        return {
+            "message_sid": message_sid,
+            "recipient": recipient or (current or {}).get("recipient"),
+            "sender": sender or (current or {}).get("sender"),
+            "status": status,
+            "error_code": error_code or (current or {}).get("error_code"),
+            "created_at": (current or {}).get("created_at", now),
+            "updated_at": now
+        }
+
+    def _apply(self, message_sid: str, status: str, recipient: Optional[str], sender: Optional[str],
+               error_code: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Merge a status into the stored row unless it would move the message backwards (caller holds the lock)
+
+        The read and write share one BEGIN IMMEDIATE transaction, so callbacks for the same SID landing on
+        different worker processes cannot interleave and let a stale status overwrite a newer one.
+        """
+        if self._conn is None:
+            current = self._memory.get(message_sid)
+            entry = self._merge(current, message_sid, status, recipient, sender, error_code)
+        else:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._stats["disk_reads"] += 1
+                row = self._conn.execute("SELECT * FROM message_status WHERE message_sid = ?", (message_sid,)).fetchone()
+                current = dict(row) if row else None
+                entry = self._merge(current, message_sid, status, recipient, sender, error_code)
+                if entry is not None:
+                    self._write(entry)
+                self._conn.commit()
+            except sqlite3.Error:
+                self._conn.rollback()
+                raise
+        if entry is None:
+            self._stats["out_of_order"] += 1
+            self._remember(current)
+            return current
+        self._remember(entry)
+        return entry
+
+    def record_send(self, message_sid: str, recipient: str, sender: str, status: str):
+        """Store the status messages.create returned, so the SID is known before its first callback"""
+        with self._lock:
+            try:
+                self._apply(message_sid, status or "queued", recipient, sender, None)
+                self._stats["sends_recorded"] += 1
+            except sqlite3.Error as e:
+                self._stats["errors"] += 1
+                print(f"⚠️ Could not record SMS {message_sid}: {e}")
+
+    def update(self, message_sid: str, status: str, recipient: Optional[str] = None, sender: Optional[str] = None,
+               error_code: Optional[str] = None) -> Dict[str, Any]:
+        """Apply a Twilio status callback"""
+        with self._lock:
+            self._stats["callbacks"] += 1
+            try:
+                entry = self._apply(message_sid, status, recipient, sender, error_code)
+                return {"success": True, **entry}
+            except sqlite3.Error as e:
+                self._stats["errors"] += 1
+                return {"success": False, "error": f"Failed to store delivery status: {str(e)}"}
+
+    def get(self, message_sid: str) -> Optional[Dict[str, Any]]:
+        """Latest status of one message"""
+        with self._lock:
+            try:
+                return self._read(message_sid)
+            except sqlite3.Error as e:
+                self._stats["errors"] += 1
+                print(f"⚠️ Delivery status read failed: {e}")
+                return None
+
+    def by_recipient(self, recipient: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent messages to one recipient, newest first"""
+        with self._lock:
+            if self._conn is None:
+                entries = [dict(e) for e in self._memory.values() if e["recipient"] == recipient]
+                return sorted(entries, key=lambda e: e["created_at"], reverse=True)[:limit]
+            try:
+                self._stats["disk_reads"] += 1
+                rows = self._conn.execute(
+                    "SELECT * FROM message_status WHERE recipient = ? ORDER BY created_at DESC LIMIT ?",
+                    (recipient, limit)
+                ).fetchall()
+                return [dict(row) for row in rows]
+            except sqlite3.Error as e:
+                self._stats["errors"] += 1
+                print(f"⚠️ Delivery status read failed: {e}")
+                return []
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Report callbacks received and how lookups were served"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        return {"enabled": True, "persistent": self._conn is not None, **stats}
+
+    def close(self):
+        """Close the SQLite connection"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
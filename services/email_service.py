@@ -19,6 +19,8 @@ except ImportError:
 # Import email libraries
 import smtplib
 import ssl
+import threading
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
@@ -91,7 +93,7 @@ class EmailService:
     """SMTP Email service with provider support"""
     
     def __init__(self, smtp_server: str, smtp_port: int, email_address: str, 
-                 email_password: str, email_name: str, email_provider: str):
+                 email_password: str, email_name: str, email_provider: str, warm_idle_seconds: int = 30):
         print(f"🔍 DEBUG - EmailService init called with:")
         print(f"   smtp_server: {smtp_server}")
         print(f"   smtp_port: {smtp_port}")
@@ -104,6 +106,11 @@ class EmailService:
         self.email_password = email_password
         self.email_name = email_name
         self.email_provider = email_provider.lower()
+        # One logged-in connection opened ahead of a send (see warm_connection)
+        self.warm_idle_seconds = warm_idle_seconds
+        self._warm_server = None
+        self._warm_opened_at = 0.0
+        self._warm_lock = threading.Lock()
         
         print(f"🔍 DEBUG - Before _configure_provider_defaults:")
         print(f"   self.smtp_server: {self.smtp_server}")
@@ -158,15 +165,25 @@ class EmailService:
             body_type = "html" if is_html else "plain"
             msg.attach(MIMEText(message, body_type))
             
-            print(f"🔍 DEBUG - Connecting to SMTP server: {self.smtp_server}:{self.smtp_port}")
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                print(f"🔍 DEBUG - Connected! Starting TLS...")
-                server.starttls()
-                print(f"🔍 DEBUG - TLS started! Attempting login...")
-                server.login(self.email_address, self.email_password)
-                print(f"🔍 DEBUG - Login successful! Sending email...")
-                server.sendmail(self.email_address, to, msg.as_string())
-                print(f"🔍 DEBUG - Email sent successfully!")
+            sent = False
+            server = self._take_warm_connection()
+            if server is not None:
+                print(f"🔍 DEBUG - Reusing warm SMTP connection...")
+                try:
+                    server.sendmail(self.email_address, to, msg.as_string())
+                    sent = True
+                except smtplib.SMTPServerDisconnected:
+                    print(f"🔍 DEBUG - Warm connection was dropped by the server, reconnecting...")
+                finally:
+                    self._close_quietly(server)
+            if not sent:
+                server = self._connect()
+                try:
+                    print(f"🔍 DEBUG - Login successful! Sending email...")
+                    server.sendmail(self.email_address, to, msg.as_string())
+                finally:
+                    self._close_quietly(server)
+            print(f"🔍 DEBUG - Email sent successfully!")
             
             return {
                 "success": True,
@@ -182,6 +199,57 @@ class EmailService:
             print(f"🔍 DEBUG - Email send failed with error: {str(e)}")
             return {"success": False, "error": f"Failed to send email: {str(e)}"}
     
+    def _connect(self) -> smtplib.SMTP:
+        """Open an SMTP connection, start TLS and log in"""
+        print(f"🔍 DEBUG - Connecting to SMTP server: {self.smtp_server}:{self.smtp_port}")
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port)
+        try:
+            print(f"🔍 DEBUG - Connected! Starting TLS...")
+            server.starttls()
+            print(f"🔍 DEBUG - TLS started! Attempting login...")
+            server.login(self.email_address, self.email_password)
+        except Exception:
+            self._close_quietly(server)
+            raise
+        return server
+    
+    @staticmethod
+    def _close_quietly(server: smtplib.SMTP):
+        """QUIT, ignoring a connection the server already dropped"""
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+    
+    def _take_warm_connection(self):
+        """Hand out the pre-opened connection if it is still fresh; each one serves a single send"""
+        with self._warm_lock:
+            server, self._warm_server = self._warm_server, None
+            opened_at = self._warm_opened_at
+        if server is not None and time.monotonic() - opened_at > self.warm_idle_seconds:
+            self._close_quietly(server)
+            return None
+        return server
+    
+    def warm_connection(self) -> bool:
+        """Connect, start TLS and log in ahead of a send so the next send_email skips the handshake"""
+        if not self.email_address or not self.email_password:
+            return False
+        with self._warm_lock:
+            if self._warm_server is not None and time.monotonic() - self._warm_opened_at <= self.warm_idle_seconds:
+                return False
+        try:
+            server = self._connect()
+        except Exception as e:
+            print(f"⚠️ SMTP warm-up failed: {e}")
+            return False
+        with self._warm_lock:
+            previous, self._warm_server = self._warm_server, server
+            self._warm_opened_at = time.monotonic()
+        if previous is not None:
+            self._close_quietly(previous)
+        return True
+    
     def test_connection(self) -> Dict[str, Any]:
         """Test email connection"""
         if not self.email_address or not self.email_password:
@@ -664,6 +732,26 @@ def get_html_template():
         let retryDelay = 2000;
         let lastError = null;
         let shouldStop = false;
+        let sessionId = newSessionId();
+        let lastPrefetchAt = 0;
+
+        function newSessionId() {{
+            return Date.now().toString(36) + Math.random().toString(36).slice(2);
+        }}
+
+        // Send transcripts as they form so the server can parse, enhance and open connections early
+        function prefetchTranscript(text, isFinal) {{
+            const now = Date.now();
+            if (!text || (!isFinal && now - lastPrefetchAt < 250)) {{
+                return;
+            }}
+            lastPrefetchAt = now;
+            fetch('/prefetch', {{
+                method: 'POST',
+                headers: {{ 'Content-Type': 'application/json' }},
+                body: JSON.stringify({{ session_id: sessionId, text: text, final: isFinal }})
+            }}).catch(error => console.log('Prefetch skipped:', error));
+        }}
 
         const voiceIndicator = document.getElementById('voiceIndicator');
         const statusText = document.getElementById('statusText');
@@ -732,6 +820,13 @@ def get_html_template():
                         console.log('Speech detected:', currentText);
                     }}
                     
+                    if (interimTranscript && !finalTranscript && !isProcessingCommand) {{
+                        const pendingCommand = (commandBuffer + interimTranscript).trim();
+                        if (checkForWakeWordInBuffer(pendingCommand)) {{
+                            prefetchTranscript(pendingCommand, false);
+                        }}
+                    }}
+                    
                     if (finalTranscript && !isProcessingCommand) {{
                         console.log('Final transcript received:', finalTranscript.trim());
                         
@@ -745,6 +840,8 @@ def get_html_template():
                         const hasWakeWord = checkForWakeWordInBuffer(commandBuffer);
                         
                         if (hasWakeWord) {{
+                            prefetchTranscript(commandBuffer.trim(), true);
+                            
                             // Check if command looks incomplete (wait longer for complete commands)
                             const commandLower = commandBuffer.toLowerCase().trim();
                             const hasActionWord = commandLower.includes('text') || commandLower.includes('send') || commandLower.includes('message') || commandLower.includes('email');
@@ -920,11 +1017,11 @@ def get_html_template():
             transcriptionText.textContent = fullText;
             try {{
                 updateUI('processing', '📤 Sending command...', '⚙️');
-                console.log('Sending request to /execute with:', {{ text: fullText }});
+                console.log('Sending request to /execute with:', {{ text: fullText, session_id: sessionId }});
                 const apiResponse = await fetch('/execute', {{
                     method: 'POST',
                     headers: {{ 'Content-Type': 'application/json' }},
-                    body: JSON.stringify({{ text: fullText }})
+                    body: JSON.stringify({{ text: fullText, session_id: sessionId }})
                 }});
                 console.log('API response status:', apiResponse.status);
                 const data = await apiResponse.json();
@@ -944,6 +1041,7 @@ def get_html_template():
                 updateUI('listening', '❌ Network error. Listening for next command...', '👂');
             }} finally {{
                 isProcessingCommand = false;
+                sessionId = newSessionId();
                 setTimeout(() => {{
                     transcriptionText.textContent = 'Waiting for wake word command...';
                     transcription.classList.remove('active');
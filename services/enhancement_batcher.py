@@ -0,0 +1,101 @@
+import threading
+from typing import Dict, Any, Callable, List, Optional
+from services.claude_prompts import build_batch_enhance_prompt, parse_batch_enhance_response
+
+class _BatchItem:
+    """One caller waiting for its message to come back from a batch"""
+
+    def __init__(self, message: str):
+        self.message = message
+        self.done = threading.Event()
+        self.result = None
+
+class EnhancementBatcher:
+    """Collect enhance_message calls over a short window and send them as one Claude request"""
+
+    def __init__(self, call_claude: Callable[[str], Dict[str, Any]], window_ms: int, max_items: int):
+        self.call_claude = call_claude
+        self.window_seconds = window_ms / 1000.0
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self._pending = []
+        self._timer = None
+        self._stats = {
+            "batches_sent": 0,
+            "items_batched": 0,
+            "singles": 0,
+            "fallbacks": 0,
+            "timeouts": 0
+        }
+
+    def submit(self, message: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Wait (up to timeout seconds) for message to be enhanced as part of a batch; None means the caller should call Claude itself"""
+        item = _BatchItem(message)
+        batch = None
+        with self._lock:
+            self._pending.append(item)
+            if len(self._pending) >= self.max_items:
+                batch = self._take_pending()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window_seconds, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if batch:
+            # Send from its own thread so the submitter that filled the batch still waits no longer than its timeout
+            threading.Thread(target=self._send, args=(batch,), name="enhance-batch", daemon=True).start()
+        if not item.done.wait(timeout):
+            # The batch still completes for the others; this caller's budget ran out first
+            with self._lock:
+                self._stats["timeouts"] += 1
+            return None
+        return item.result
+
+    def _take_pending(self) -> List[_BatchItem]:
+        """Detach the pending items; caller must hold the lock"""
+        batch = self._pending
+        self._pending = []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _flush_on_timer(self):
+        """Send whatever accumulated during the window"""
+        with self._lock:
+            batch = self._take_pending()
+        if batch:
+            self._send(batch)
+
+    def _send(self, batch: List[_BatchItem]):
+        """Send one batched request and hand each caller its result"""
+        try:
+            if len(batch) == 1:
+                with self._lock:
+                    self._stats["singles"] += 1
+                return
+
+            result = self.call_claude(build_batch_enhance_prompt([item.message for item in batch]))
+            enhanced = [None] * len(batch)
+            if result["success"]:
+                enhanced = parse_batch_enhance_response(result["content"], len(batch))
+            else:
+                print(f"Batched enhancement failed: {result['error']}")
+
+            for item, text in zip(batch, enhanced):
+                item.result = text
+            with self._lock:
+                self._stats["batches_sent"] += 1
+                self._stats["items_batched"] += len(batch)
+                self._stats["fallbacks"] += sum(1 for text in enhanced if text is None)
+        finally:
+            for item in batch:
+                item.done.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Report batch sizes and fallback counts"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+        stats["avg_batch_size"] = round(stats["items_batched"] / stats["batches_sent"], 2) if stats["batches_sent"] else 0.0
+        return stats
@@ -0,0 +1,144 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+class EnhancementCache:
+    """Two-tier cache for enhanced messages: in-memory LRU in front of SQLite"""
+
+    def __init__(self, db_path: str, ttl_seconds: int, max_entries: int, memory_entries: int):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "evictions": 0,
+            "bypassed": 0,
+            "errors": 0
+        }
+        self._setup_database()
+
+    def _setup_database(self):
+        """Open the shared SQLite store (WAL so several workers can read concurrently)"""
+        try:
+            self._conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS enhancements ("
+                "key TEXT PRIMARY KEY, enhanced TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_enhancements_last_access ON enhancements(last_access)")
+            self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ Enhancement cache running memory-only, SQLite unavailable: {e}")
+            self._conn = None
+
+    @staticmethod
+    def normalize(message: str) -> str:
+        """Normalize a message so trivial variations share a cache entry"""
+        return re.sub(r'\s+', ' ', message).strip().lower()
+
+    @staticmethod
+    def make_key(message: str, prompt_version: str, model: str) -> str:
+        """Content-address a message by its normalized text, prompt version and model"""
+        raw = f"{prompt_version}\x00{model}\x00{EnhancementCache.normalize(message)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up an enhancement, promoting disk hits into memory"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                enhanced, created_at = entry
+                if now - created_at < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return enhanced
+                del self._memory[key]
+
+            if self._conn is not None:
+                try:
+                    row = self._conn.execute(
+                        "SELECT enhanced, created_at FROM enhancements WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row and now - row[1] < self.ttl_seconds:
+                        self._conn.execute("UPDATE enhancements SET last_access = ? WHERE key = ?", (now, key))
+                        self._conn.commit()
+                        self._remember(key, row[0], row[1])
+                        self._stats["disk_hits"] += 1
+                        return row[0]
+                    if row:
+                        self._conn.execute("DELETE FROM enhancements WHERE key = ?", (key,))
+                        self._conn.commit()
+                        self._stats["evictions"] += 1
+                except sqlite3.Error as e:
+                    self._stats["errors"] += 1
+                    print(f"⚠️ Enhancement cache read failed: {e}")
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, enhanced: str):
+        """Store an enhancement in both tiers"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, enhanced, now)
+            self._stats["writes"] += 1
+
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO enhancements (key, enhanced, created_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, enhanced, now, now)
+                )
+                cursor = self._conn.execute(
+                    "DELETE FROM enhancements WHERE created_at < ? OR key IN "
+                    "(SELECT key FROM enhancements ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (now - self.ttl_seconds, self.max_entries)
+                )
+                self._stats["evictions"] += max(cursor.rowcount, 0)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                self._stats["errors"] += 1
+                print(f"⚠️ Enhancement cache write failed: {e}")
+
+    def record_bypass(self):
+        """Count a lookup that was skipped on request"""
+        with self._lock:
+            self._stats["bypassed"] += 1
+
+    def _remember(self, key: str, enhanced: str, created_at: float):
+        """Insert into the memory tier, evicting the least recently used entry"""
+        self._memory[key] = (enhanced, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+    def close(self):
+        """Close the SQLite connection"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
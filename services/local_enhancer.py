@@ -0,0 +1,109 @@
+import difflib
+import re
+import threading
+from typing import Dict, Any, Optional
+from utils.formatters import clean_voice_message
+
+# Common English words; anything outside this list (or a number, time, proper noun, address) goes to Claude
+COMMON_WORDS = frozenset("""
+a about above after afternoon again against all almost alone along already also always am an and another any
+anyone anything appointment are around arrive arrived arriving as ask asked at available away back be because
+been before behind being below best better between birthday bit both bring brought but buy by bye call called
+calling came can cancel canceled cancelled car check client come coming confirm confirmed could day days
+deadline dear did dinner do does doing done down drive during each early either else email emailed end evening
+every everyone everything few file files finish finished first for forgot free friday from get getting give go
+going gone good got great had happy has have having he hello her here hi him his home hope hour hours how i if
+in instead into is it its just keep know last late later leave leaving left let love lunch make many may me meet
+meeting message minute minutes miss monday more morning most moved moving much must my need needs new next night
+no not note now of off office ok okay on once one only or order other our out over people phone pick plan please
+ready really remember reminder report reschedule rescheduled right room running said same saturday schedule
+scheduled see send sent should so some someone something soon sorry still stop sunday sure take talk team tell
+than thank thanks that the their them then there these they thing things think this those thursday time to today
+tomorrow tonight too traffic tuesday two until up update us wait waiting want was way we wednesday week welcome
+well were what when where which while who why will with work working would yes yesterday yet you your
+""".split())
+
+# Speech-recognition artifacts that clean_voice_message does not already handle
+FILLER_PATTERN = re.compile(r'\b(?:um+|uh+|erm|hmm+)\b[,]?\s*', re.IGNORECASE)
+REPEATED_WORD_PATTERN = re.compile(r'\b(\w+)(\s+\1\b)+', re.IGNORECASE)
+TOKEN_PATTERN = re.compile(r"[A-Za-z0-9@.+:'\-]+")
+# A capitalized word this close to a common word is more likely a misspelling ("Tomorow") than a name
+NEAR_MISS_CUTOFF = 0.85
+TIME_PATTERN = re.compile(r"^\d{1,2}(?::\d{2})?(?:am|pm)?$|^\d+(?:st|nd|rd|th)?$", re.IGNORECASE)
+CONTRACTION_SUFFIXES = ("'s", "'ll", "'re", "'ve", "'m", "'d", "n't")
+CONTRACTION_STEMS = frozenset(("wo", "ca", "sha"))  # won't, can't, shan't
+
+class LocalEnhancer:
+    """Cheap heuristic pre-check that keeps already-clean messages away from Claude"""
+
+    def __init__(self, max_words: int):
+        self.max_words = max_words
+        self._lock = threading.Lock()
+        self._stats = {
+            "checked": 0,
+            "skipped_clean": 0,
+            "cleaned_locally": 0,
+            "sent_to_claude": 0
+        }
+
+    def _is_known_word(self, token: str, first: bool) -> bool:
+        """Whether a token looks correctly spelled without asking Claude"""
+        word = token.strip(".-'")
+        if not word:
+            return True
+        if "@" in word or TIME_PATTERN.match(word) or word.replace("-", "").isdigit():
+            return True
+        lower = word.lower()
+        # Capitalized words mid-sentence are treated as names, unless they look like a misspelled common word
+        if not first and word[0].isupper() and word[1:].islower():
+            return lower in COMMON_WORDS or not difflib.get_close_matches(lower, COMMON_WORDS, n=1, cutoff=NEAR_MISS_CUTOFF)
+        for suffix in CONTRACTION_SUFFIXES:
+            if lower.endswith(suffix) and len(lower) > len(suffix):
+                lower = lower[:-len(suffix)]
+                break
+        return lower in COMMON_WORDS or lower in CONTRACTION_STEMS
+
+    def _cleanup(self, text: str) -> str:
+        """Deterministic fixes: ASR artifacts, fillers, repeated words, 'i', capitalization, final punctuation"""
+        text = clean_voice_message(text)
+        text = FILLER_PATTERN.sub("", text)
+        text = REPEATED_WORD_PATTERN.sub(r"\1", text)
+        text = re.sub(r"\bi\b", "I", text)
+        text = re.sub(r"\s+([,.!?])", r"\1", text)
+        text = re.sub(r"\s+", " ", text).strip()
+        if text:
+            text = text[0].upper() + text[1:]
+            if text[-1] not in ".!?":
+                text += "."
+        return text
+
+    def enhance(self, message: str) -> Optional[str]:
+        """Return a locally enhanced message, or None when the text should go to Claude"""
+        with self._lock:
+            self._stats["checked"] += 1
+
+        cleaned = self._cleanup(message)
+        tokens = list(TOKEN_PATTERN.finditer(cleaned))
+        # A token is sentence-initial when only sentence-ending punctuation (or nothing) precedes it
+        eligible = 0 < len(tokens) <= self.max_words and all(
+            self._is_known_word(match.group(), re.search(r"(?:^|[.!?])\s*$", cleaned[:match.start()]) is not None)
+            for match in tokens
+        )
+
+        with self._lock:
+            if not eligible:
+                self._stats["sent_to_claude"] += 1
+                return None
+            if cleaned == message.strip():
+                self._stats["skipped_clean"] += 1
+            else:
+                self._stats["cleaned_locally"] += 1
+        return cleaned
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Report what share of enhancements never reached Claude"""
+        with self._lock:
+            stats = dict(self._stats)
+        local = stats["skipped_clean"] + stats["cleaned_locally"]
+        stats["local_share"] = round(local / stats["checked"], 3) if stats["checked"] else 0.0
+        return stats
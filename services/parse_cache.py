@@ -0,0 +1,150 @@
+import copy
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Tuple, Optional
+
+# Slot patterns in extraction order; the message body goes first so numbers inside it stay part of it
+SLOT_PATTERNS = [
+    ("MESSAGE", re.compile(r'\b(?:saying|that)\s+(.+)$', re.IGNORECASE)),
+    ("EMAIL", re.compile(r'([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,})')),
+    ("PHONE", re.compile(r'(\+?\d[\d\-\s().]{8,}\d)')),
+    ("QUOTED", re.compile(r'"([^"]+)"|“([^”]+)”')),
+    ("TIME", re.compile(
+        r'\b(\d{1,2}(?::\d{2})?\s*(?:am|pm|a\.m\.|p\.m\.)|\d{1,2}:\d{2}'
+        r'|\d+\s+(?:seconds?|minutes?|hours?|days?|weeks?|months?))\b',
+        re.IGNORECASE
+    )),
+]
+
+# Fields holding absolute times computed relative to "now"; such results must not be replayed later
+TIME_SENSITIVE_FIELDS = ("due_date", "reminder_time")
+# Fields that are never slot values; a slot value showing up inside one would be rewritten on replay
+STRUCTURAL_FIELDS = ("action",)
+
+Slots = List[Tuple[str, str]]
+
+class ParseTemplateCache:
+    """Cache parse_command results keyed by the command with its variable parts abstracted out"""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stored": 0,
+            "not_cacheable": 0
+        }
+
+    @staticmethod
+    def abstract(prompt: str) -> Tuple[str, Slots]:
+        """Replace phones, emails, quoted text, times and the message body with placeholders"""
+        template = re.sub(r'\s+', ' ', prompt).strip()
+        slots = []
+
+        for name, pattern in SLOT_PATTERNS:
+            def replace(match, name=name):
+                group = next(i for i in range(1, len(match.groups()) + 1) if match.group(i) is not None)
+                placeholder = f"__{name}_{sum(1 for p, _ in slots if p.startswith(f'__{name}_'))}__"
+                slots.append((placeholder, match.group(group)))
+                start, end = match.span(group)
+                whole_start, whole_end = match.span()
+                return match.string[whole_start:start] + placeholder + match.string[end:whole_end]
+            template = pattern.sub(replace, template)
+
+        return template.lower(), slots
+
+    @staticmethod
+    def _map_strings(value: Any, fn) -> Any:
+        """Apply fn to every string inside a JSON-like value"""
+        if isinstance(value, str):
+            return fn(value)
+        if isinstance(value, list):
+            return [ParseTemplateCache._map_strings(v, fn) for v in value]
+        if isinstance(value, dict):
+            return {k: ParseTemplateCache._map_strings(v, fn) for k, v in value.items()}
+        return value
+
+    @staticmethod
+    def fill(abstract_result: Dict[str, Any], slots: Slots) -> Dict[str, Any]:
+        """Put the real slot values back into a cached result"""
+        def substitute(text):
+            for placeholder, value in slots:
+                text = text.replace(placeholder, value)
+            return text
+        return ParseTemplateCache._map_strings(copy.deepcopy(abstract_result), substitute)
+
+    @staticmethod
+    def _to_abstract(result: Dict[str, Any], slots: Slots) -> Optional[Dict[str, Any]]:
+        """Turn a concrete result into a template result, or None if it cannot be safely replayed"""
+        if any(result.get(field) for field in TIME_SENSITIVE_FIELDS):
+            return None
+
+        for field in STRUCTURAL_FIELDS:
+            structural = str(result.get(field) or "").lower()
+            if any(value.lower() in structural for _, value in slots):
+                return None
+
+        found = set()
+        # Whole-word matches only, so a short value ("ok", "me") never rewrites part of a longer word
+        ordered = [
+            (placeholder, re.compile(r'(?<!\w)' + re.escape(value) + r'(?!\w)'))
+            for placeholder, value in sorted(slots, key=lambda slot: len(slot[1]), reverse=True)
+        ]
+
+        def abstract_text(text):
+            for placeholder, pattern in ordered:
+                text, count = pattern.subn(placeholder, text)
+                if count:
+                    found.add(placeholder)
+            return text
+
+        abstract_result = ParseTemplateCache._map_strings(result, abstract_text)
+        # A slot Claude rewrote (e.g. a reformatted phone number) would replay stale data
+        if len(found) != len(slots):
+            return None
+        if ParseTemplateCache.fill(abstract_result, slots) != result:
+            return None
+        return abstract_result
+
+    def get(self, template: str, slots: Slots) -> Optional[Dict[str, Any]]:
+        """Return a filled-in cached result for this template, if any"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(template)
+            if entry is not None and now - entry[1] < self.ttl_seconds:
+                self._entries.move_to_end(template)
+                self._stats["hits"] += 1
+                abstract_result = entry[0]
+            else:
+                if entry is not None:
+                    del self._entries[template]
+                self._stats["misses"] += 1
+                return None
+        return self.fill(abstract_result, slots)
+
+    def store(self, template: str, slots: Slots, result: Dict[str, Any]):
+        """Cache a fresh parse result under its template when it is safe to replay"""
+        abstract_result = self._to_abstract(result, slots)
+        with self._lock:
+            if abstract_result is None:
+                self._stats["not_cacheable"] += 1
+                return
+            self._entries[template] = (abstract_result, time.time())
+            self._entries.move_to_end(template)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._stats["stored"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
@@ -0,0 +1,186 @@
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Optional
+from services.message_parser import MessageParser
+from utils.deadline import Deadline
+
+# The regex stages of the /execute pipeline, in the same order
+REGEX_STAGES = (
+    MessageParser.extract_reminder_command,
+    MessageParser.extract_email_command,
+    MessageParser.extract_email_command_multi,
+    MessageParser.extract_sms_command,
+    MessageParser.extract_sms_command_multi,
+)
+# Enhancement futures kept per session; older interim messages are unlikely to be the final one
+MAX_ENHANCEMENTS_PER_SESSION = 8
+
+def normalize_transcript(text: str) -> str:
+    """Compare transcripts ignoring case, spacing and trailing punctuation"""
+    return re.sub(r"\s+", " ", text).strip().rstrip(".!?").lower()
+
+class _PrefetchSession:
+    """Work started for one speaking session"""
+
+    def __init__(self):
+        self.text = ""
+        self.repeats = 0
+        self.updated = time.monotonic()
+        self.speculation = None
+        self.speculation_text = None
+        self.enhancements: Dict[tuple, Future] = {}
+        self.warmed = set()
+
+class CommandPrefetcher:
+    """Start parsing, enhancement and connection warm-up from interim transcripts, for /execute to reuse"""
+
+    def __init__(self, action_handlers, twilio_service, email_service, speculative_parser, max_workers: int,
+                 stable_updates: int, enhance_budget_ms: int, session_ttl: int):
+        self.action_handlers = action_handlers
+        self.twilio_service = twilio_service
+        self.email_service = email_service
+        self.speculative_parser = speculative_parser
+        self.stable_updates = stable_updates
+        self.enhance_budget_ms = enhance_budget_ms
+        self.session_ttl = session_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, _PrefetchSession] = {}
+        self._stats = {
+            "updates": 0,
+            "stable_updates": 0,
+            "enhancements_started": 0,
+            "speculations_started": 0,
+            "warmups": 0,
+            "claimed": 0,
+            "speculation_reused": 0,
+            "expired": 0
+        }
+
+    @staticmethod
+    def _parse_locally(text: str) -> Optional[Dict[str, Any]]:
+        """First regex stage that matches the transcript, or None"""
+        for stage in REGEX_STAGES:
+            command = stage(text)
+            if command:
+                return command
+        return None
+
+    def _expire(self, now: float):
+        """Drop sessions that never reached /execute (caller holds the lock)"""
+        for session_id in [sid for sid, s in self._sessions.items() if now - s.updated > self.session_ttl]:
+            self._release(self._sessions.pop(session_id))
+            self._stats["expired"] += 1
+
+    def _release(self, session: _PrefetchSession):
+        """Give up a session's unclaimed speculative parse"""
+        if session.speculation and self.speculative_parser:
+            self.speculative_parser.discard(session.speculation)
+        session.speculation = None
+
+    def _warm(self, session: _PrefetchSession, channel: Optional[str]):
+        """Open the channel's connection in the background, once per session"""
+        if not channel:
+            return
+        with self._lock:
+            if channel in session.warmed:
+                return
+            session.warmed.add(channel)
+            self._stats["warmups"] += 1
+        service = self.twilio_service if channel == "sms" else self.email_service
+        self._executor.submit(service.warm_connection)
+
+    def _start_enhancements(self, session: _PrefetchSession, plan: Dict[str, Any]):
+        """Submit the plan's enhancements that are not already running for this session"""
+        for kind, message in plan["enhancements"]:
+            with self._lock:
+                if (kind, message) in session.enhancements:
+                    continue
+                if len(session.enhancements) >= MAX_ENHANCEMENTS_PER_SESSION:
+                    session.enhancements.pop(next(iter(session.enhancements)))
+                session.enhancements[(kind, message)] = self._executor.submit(
+                    self.action_handlers.enhance_ahead, kind, message, self.enhance_budget_ms
+                )
+                self._stats["enhancements_started"] += 1
+            print(f"[PREFETCH] Enhancing ahead ({kind}): {message}")
+
+    def _after_speculative_parse(self, session: _PrefetchSession, future: Future):
+        """Once Claude has parsed a stable transcript, start what its action will need"""
+        if future.cancelled() or future.exception():
+            return
+        result = future.result()
+        if "error" in result:
+            return
+        plan = self.action_handlers.prefetch_plan(result)
+        self._warm(session, plan["channel"])
+        self._start_enhancements(session, plan)
+
+    def update(self, session_id: str, text: str, final: bool = False) -> Dict[str, Any]:
+        """Record an interim transcript; start speculative work once it is stable enough"""
+        now = time.monotonic()
+        normalized = normalize_transcript(text)
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.setdefault(session_id, _PrefetchSession())
+            session.updated = now
+            session.repeats = session.repeats + 1 if normalized == session.text else 1
+            session.text = normalized
+            stable = final or session.repeats >= self.stable_updates
+            self._stats["updates"] += 1
+            if stable:
+                self._stats["stable_updates"] += 1
+
+        command = self._parse_locally(text)
+        plan = self.action_handlers.prefetch_plan(command) if command else {"channel": None, "recipients": [], "enhancements": []}
+        # Connections are cheap to open, so warm them as soon as the action is known
+        self._warm(session, plan["channel"])
+
+        if stable and command:
+            self._start_enhancements(session, plan)
+        elif stable and self.speculative_parser:
+            with self._lock:
+                previous = session.speculation if session.speculation_text != normalized else None
+                start = session.speculation is None or previous is not None
+            if start:
+                if previous:
+                    self.speculative_parser.discard(previous)
+                speculation = self.speculative_parser.start(text)
+                with self._lock:
+                    session.speculation = speculation
+                    session.speculation_text = normalized if speculation else None
+                if speculation:
+                    with self._lock:
+                        self._stats["speculations_started"] += 1
+                    speculation.future.add_done_callback(lambda f: self._after_speculative_parse(session, f))
+
+        return {
+            "success": True,
+            "stable": stable,
+            "action": command.get("action") if command else None,
+            "recipients": plan["recipients"]
+        }
+
+    def claim(self, session_id: str, text: str, deadline: Deadline):
+        """Hand a session's prefetched work to the final /execute; returns its speculative parse if the text matches"""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is None:
+                return None
+            self._stats["claimed"] += 1
+        deadline.prefetched.update(session.enhancements)
+        if session.speculation and session.speculation_text == normalize_transcript(text):
+            with self._lock:
+                self._stats["speculation_reused"] += 1
+            print("[PREFETCH] Reusing Claude parse started from an interim transcript")
+            return session.speculation
+        self._release(session)
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Report how much interim-transcript work was started and claimed"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["active_sessions"] = len(self._sessions)
+        return {"enabled": True, **stats}
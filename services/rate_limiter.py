@@ -0,0 +1,159 @@
+import sqlite3
+import threading
+import time
+from typing import Dict, Any
+
+class RateLimitTimeout(Exception):
+    """No rate-limit budget became available within the caller's wait limit"""
+
+class SharedRateLimiter:
+    """Requests-per-minute and tokens-per-minute token buckets shared by every worker process via SQLite
+
+    Each acquire runs in a BEGIN IMMEDIATE transaction, so refilling and spending a bucket is atomic
+    across processes. A 429's retry-after pauses all workers until the API is ready again.
+    """
+
+    def __init__(self, db_path: str, requests_per_minute: int, tokens_per_minute: int):
+        self.db_path = db_path
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._lock = threading.Lock()
+        self._conn = None
+        self._stats = {
+            "acquired": 0,
+            "waited": 0,
+            "wait_ms_total": 0.0,
+            "timed_out": 0,
+            "retry_after_pauses": 0,
+            "errors": 0
+        }
+        self._setup_database()
+
+    def _setup_database(self):
+        """Open the shared bucket table, starting both buckets full (paused_until holds a timestamp)"""
+        try:
+            self._conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_buckets ("
+                "name TEXT PRIMARY KEY, value REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            now = time.time()
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO rate_buckets (name, value, updated_at) VALUES (?, ?, ?)",
+                [("requests", self.requests_per_minute, now), ("tokens", self.tokens_per_minute, now), ("paused_until", 0, now)]
+            )
+        except sqlite3.Error as e:
+            print(f"⚠️ Claude rate limiter disabled, SQLite unavailable: {e}")
+            self._conn = None
+
+    def _try_acquire(self, tokens: int) -> float:
+        """Spend from both buckets if possible; return 0 on success, else seconds until it could succeed"""
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = dict(
+                (name, (value, updated_at))
+                for name, value, updated_at in self._conn.execute("SELECT name, value, updated_at FROM rate_buckets")
+            )
+            paused_until = rows["paused_until"][0]
+            if paused_until > now:
+                return paused_until - now
+
+            levels = {}
+            waits = []
+            for name, capacity, needed in (("requests", self.requests_per_minute, 1), ("tokens", self.tokens_per_minute, tokens)):
+                value, updated_at = rows[name]
+                rate = capacity / 60.0
+                level = min(capacity, value + (now - updated_at) * rate)
+                levels[name] = level - needed
+                if level < needed:
+                    waits.append((needed - level) / rate)
+            if waits:
+                return max(waits)
+
+            self._conn.executemany(
+                "UPDATE rate_buckets SET value = ?, updated_at = ? WHERE name = ?",
+                [(level, now, name) for name, level in levels.items()]
+            )
+            return 0.0
+        finally:
+            self._conn.execute("COMMIT")
+
+    def acquire(self, tokens: int, max_wait: float):
+        """Block until one request and `tokens` tokens are available, raising RateLimitTimeout after max_wait"""
+        if self._conn is None:
+            return
+        tokens = min(tokens, self.tokens_per_minute)
+        started = time.monotonic()
+        slept = False
+        while True:
+            try:
+                with self._lock:
+                    wait = self._try_acquire(tokens)
+            except sqlite3.Error as e:
+                # Fail open: a broken limiter must not take Claude calls down with it
+                print(f"⚠️ Claude rate limiter error: {e}")
+                with self._lock:
+                    self._stats["errors"] += 1
+                return
+
+            waited = time.monotonic() - started
+            if wait <= 0:
+                with self._lock:
+                    self._stats["acquired"] += 1
+                    if slept:
+                        self._stats["waited"] += 1
+                        self._stats["wait_ms_total"] += waited * 1000
+                return
+            if waited + wait > max_wait:
+                with self._lock:
+                    self._stats["timed_out"] += 1
+                raise RateLimitTimeout(f"Claude rate limit: next slot in {wait:.2f}s, wait limit {max_wait:.2f}s")
+            time.sleep(wait)
+            slept = True
+
+    def settle(self, estimated_tokens: int, actual_tokens: int):
+        """Refund (or charge) the difference between the pre-call estimate and the reported usage"""
+        if self._conn is None:
+            return
+        estimated_tokens = min(estimated_tokens, self.tokens_per_minute)
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE rate_buckets SET value = MIN(?, value + ?) WHERE name = 'tokens'",
+                    (self.tokens_per_minute, estimated_tokens - actual_tokens)
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️ Claude rate limiter error: {e}")
+
+    def pause(self, seconds: float):
+        """Hold every worker back until a 429's retry-after has passed"""
+        if self._conn is None:
+            return
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE rate_buckets SET value = MAX(value, ?) WHERE name = 'paused_until'",
+                    (time.time() + seconds,)
+                )
+                self._stats["retry_after_pauses"] += 1
+            print(f"[RATE LIMIT] Claude returned 429, pausing all workers for {seconds:.1f}s")
+        except sqlite3.Error as e:
+            print(f"⚠️ Claude rate limiter error: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Report configured budgets and how often callers had to queue"""
+        with self._lock:
+            stats = dict(self._stats)
+        wait_total = stats.pop("wait_ms_total")
+        stats["avg_wait_ms"] = round(wait_total / stats["waited"], 1) if stats["waited"] else None
+        stats["requests_per_minute"] = self.requests_per_minute
+        stats["tokens_per_minute"] = self.tokens_per_minute
+        return stats
+
+    def close(self):
+        """Close the SQLite connection"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
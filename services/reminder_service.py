@@ -212,6 +212,31 @@ class ReminderService:
         except Exception as e:
             return {"success": False, "error": f"Failed to schedule email reminder: {str(e)}"}
     
+    def update_reminder_message(self, reminder_id: str, message: str, subject: str = None) -> Dict[str, Any]:
+        """Replace the text (and email subject) of a reminder that has not fired yet"""
+        try:
+            job = self.scheduler.get_job(reminder_id)
+            if job is None or job.next_run_time is None:
+                return {"success": False, "error": f"Reminder {reminder_id} already fired or was cancelled"}
+            if job.next_run_time <= datetime.now(job.next_run_time.tzinfo):
+                return {"success": False, "error": f"Reminder {reminder_id} is due, keeping its original text"}
+            
+            args = list(job.args)
+            if reminder_id.startswith('email_reminder_'):
+                if subject:
+                    args[1] = subject
+                args[2] = message
+                name = f"Email Reminder: {args[1][:50]}..."
+            else:
+                args[1] = message
+                name = f"SMS Reminder: {message[:50]}..."
+            
+            self.scheduler.modify_job(reminder_id, args=args, name=name)
+            return {"success": True, "job_id": reminder_id}
+            
+        except Exception as e:
+            return {"success": False, "error": f"Failed to update reminder: {str(e)}"}
+    
     def list_reminders(self) -> Dict[str, Any]:
         """List all scheduled reminders"""
         try:
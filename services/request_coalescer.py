@@ -0,0 +1,69 @@
+import threading
+from typing import Dict, Any, Callable, Hashable, Optional
+
+class _InFlightCall:
+    """A single in-flight call that other callers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class RequestCoalescer:
+    """Collapse concurrent identical calls into one execution (singleflight)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._executed = 0
+        self._collapsed = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Run fn once for all concurrent callers sharing key and return its result to each
+
+        Waiting callers give up with TimeoutError after timeout seconds; the leader is unaffected.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._collapsed += 1
+                leader = False
+            else:
+                call = _InFlightCall()
+                self._calls[key] = call
+                self._executed += 1
+                leader = True
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError("timed out waiting for in-flight request")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Report how many calls were executed and how many piggybacked on them"""
+        with self._lock:
+            executed = self._executed
+            collapsed = self._collapsed
+            in_flight = len(self._calls)
+        total = executed + collapsed
+        return {
+            "executed": executed,
+            "collapsed": collapsed,
+            "in_flight": in_flight,
+            "collapse_ratio": round(collapsed / total, 3) if total else 0.0
+        }
@@ -0,0 +1,134 @@
+import sqlite3
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, Any, List, Optional
+
+class SenderPool:
+    """Pool of Twilio sender numbers with sticky recipient assignment and least-loaded selection
+
+    Assignments live in SQLite so every worker process, and every restart, sends a recipient's messages from
+    the same number. With a Messaging Service SID, Twilio picks the number (and keeps it sticky) itself.
+    """
+
+    def __init__(self, numbers: List[str], messaging_service_sid: str = "", db_path: str = "sender_assignments.sqlite"):
+        self.numbers = [n for n in numbers if n]
+        self.messaging_service_sid = messaging_service_sid
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._assignments: Dict[str, str] = {}
+        self._assigned_counts = Counter()
+        self._recent_sends: Dict[str, deque] = {sender: deque() for sender in self.senders}
+        self._sent = Counter()
+        if not messaging_service_sid and len(self.numbers) > 1:
+            self._setup_database()
+
+    @property
+    def senders(self) -> List[str]:
+        """Sender identities messages are paced by: the numbers, or the Messaging Service"""
+        return [self.messaging_service_sid] if self.messaging_service_sid else self.numbers
+
+    def _setup_database(self):
+        """Open the shared assignment table and load the current assignments"""
+        try:
+            self._conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sender_assignments ("
+                "recipient TEXT PRIMARY KEY, sender TEXT NOT NULL, assigned_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+            for recipient, sender in self._conn.execute("SELECT recipient, sender FROM sender_assignments"):
+                if sender in self.numbers:
+                    self._assignments[recipient] = sender
+                    self._assigned_counts[sender] += 1
+        except sqlite3.Error as e:
+            print(f"⚠️ Sender assignments kept in memory only, SQLite unavailable: {e}")
+            self._conn = None
+
+    def _stored_assignment(self, recipient: str) -> Optional[str]:
+        """Assignment another worker process may have made since we loaded (caller holds the lock)"""
+        if self._conn is None:
+            return None
+        try:
+            row = self._conn.execute("SELECT sender FROM sender_assignments WHERE recipient = ?", (recipient,)).fetchone()
+        except sqlite3.Error:
+            return None
+        return row[0] if row and row[0] in self.numbers else None
+
+    def _store_assignment(self, recipient: str, sender: str) -> str:
+        """Persist an assignment unless another process stored one first; returns the sender that is stored"""
+        if self._conn is None:
+            return sender
+        try:
+            now = time.time()
+            self._conn.execute(
+                "INSERT OR IGNORE INTO sender_assignments (recipient, sender, assigned_at) VALUES (?, ?, ?)",
+                (recipient, sender, now)
+            )
+            row = self._conn.execute("SELECT sender FROM sender_assignments WHERE recipient = ?", (recipient,)).fetchone()
+            if row and row[0] not in self.numbers:
+                # Replace only the stale number we saw, so a concurrent reassignment still wins
+                self._conn.execute(
+                    "UPDATE sender_assignments SET sender = ?, assigned_at = ? WHERE recipient = ? AND sender = ?",
+                    (sender, now, recipient, row[0])
+                )
+                row = self._conn.execute("SELECT sender FROM sender_assignments WHERE recipient = ?", (recipient,)).fetchone()
+            self._conn.commit()
+            return row[0] if row and row[0] in self.numbers else sender
+        except sqlite3.Error as e:
+            print(f"⚠️ Could not store sender assignment: {e}")
+            return sender
+
+    def assign(self, recipient: str, pending: Optional[Dict[str, int]] = None) -> Optional[str]:
+        """Sender for a recipient: their sticky number, else the least-loaded one (fewest queued, then fewest recipients)"""
+        senders = self.senders
+        if len(senders) <= 1:
+            return senders[0] if senders else None
+        pending = pending or {}
+        with self._lock:
+            sender = self._assignments.get(recipient) or self._stored_assignment(recipient)
+            if sender is None:
+                candidate = min(senders, key=lambda n: (pending.get(n, 0), self._assigned_counts[n]))
+                sender = self._store_assignment(recipient, candidate)
+            previous = self._assignments.get(recipient)
+            if previous != sender:
+                if previous is not None:
+                    self._assigned_counts[previous] -= 1
+                self._assignments[recipient] = sender
+                self._assigned_counts[sender] += 1
+            return sender
+
+    def record_send(self, sender: str):
+        """Count a delivered message toward its sender's rate"""
+        now = time.monotonic()
+        with self._lock:
+            self._sent[sender] += 1
+            recent = self._recent_sends.setdefault(sender, deque())
+            recent.append(now)
+            while recent and now - recent[0] > 60:
+                recent.popleft()
+
+    def get_stats(self, capacity_per_second: Optional[float] = None) -> Dict[str, Any]:
+        """Per-sender sends, messages in the last minute and (given the per-number rate) utilization"""
+        now = time.monotonic()
+        senders = {}
+        with self._lock:
+            for sender in self.senders:
+                recent = self._recent_sends.setdefault(sender, deque())
+                while recent and now - recent[0] > 60:
+                    recent.popleft()
+                entry = {
+                    "sent": self._sent[sender],
+                    "sent_last_minute": len(recent),
+                    "assigned_recipients": self._assigned_counts[sender]
+                }
+                if capacity_per_second and not self.messaging_service_sid:
+                    entry["utilization"] = round(len(recent) / (capacity_per_second * 60), 3)
+                senders[sender] = entry
+        return {
+            "mode": "messaging_service" if self.messaging_service_sid else "numbers",
+            "sticky_assignments": len(self._assignments),
+            "senders": senders
+        }
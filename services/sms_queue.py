@@ -0,0 +1,253 @@
+import heapq
+import itertools
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Any, Optional
+
+class TokenBucket:
+    """Messages-per-second budget for one sender; a rate of 0 leaves it unpaced apart from 429 pauses"""
+
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate = rate_per_second
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def reserve(self, now: float) -> float:
+        """Take a token and return 0, or return the seconds until one is available"""
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.rate <= 0:
+            return 0.0
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def pause(self, seconds: float, now: float):
+        """Hold this number back after Twilio answered 429"""
+        self.paused_until = max(self.paused_until, now + seconds)
+
+class SmsQueue:
+    """Outbound SMS queue: accepts messages at once, paces them per sender number and delivers them from a worker pool
+
+    Each sender number has its own FIFO and token bucket; a heap orders the numbers by when their next message
+    may go out, so one slow number never holds back another.
+    """
+
+    def __init__(self, twilio_service, rate_per_second: float, burst: int, workers: int, max_attempts: int,
+                 max_tickets: int = 10000, service_rate_per_second: float = 0.0):
+        self.twilio_service = twilio_service
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        # A Messaging Service spreads sends over all its numbers and queues them at Twilio, so it is not paced like one number
+        self.service_rate_per_second = service_rate_per_second
+        self.max_attempts = max_attempts
+        self.max_tickets = max_tickets
+        self._cond = threading.Condition()
+        self._tickets: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._callbacks: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+        self._pending: Dict[str, deque] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._ready = []
+        self._scheduled = set()
+        self._seq = itertools.count()
+        self._running = True
+        self._stats = {
+            "accepted": 0,
+            "sent": 0,
+            "failed": 0,
+            "rate_limited": 0,
+            "retried": 0,
+            "queue_wait_ms_total": 0.0,
+            "started": 0
+        }
+        self._workers = []
+        for i in range(workers):
+            worker = threading.Thread(target=self._work, name=f"sms-delivery-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _schedule(self, from_number: str, ready_at: float):
+        """Put a sender number on the ready heap if it is not already there (caller holds the lock)"""
+        if from_number not in self._scheduled:
+            self._scheduled.add(from_number)
+            heapq.heappush(self._ready, (ready_at, next(self._seq), from_number))
+            self._cond.notify()
+
+    def _bucket(self, from_number: str) -> TokenBucket:
+        """Token bucket for a sender, paced per number or at the Messaging Service rate (caller holds the lock)"""
+        bucket = self._buckets.get(from_number)
+        if bucket is None:
+            if from_number == self.twilio_service.sender_pool.messaging_service_sid:
+                rate = self.service_rate_per_second
+                bucket = TokenBucket(rate, max(self.burst, int(rate)))
+            else:
+                bucket = TokenBucket(self.rate_per_second, self.burst)
+            self._buckets[from_number] = bucket
+        return bucket
+    
+    def _trim(self):
+        """Forget the oldest finished tickets beyond max_tickets (caller holds the lock)"""
+        while len(self._tickets) > self.max_tickets:
+            finished = next((tid for tid, t in self._tickets.items() if t["status"] in ("sent", "failed")), None)
+            if finished is None:
+                return
+            del self._tickets[finished]
+
+    def _pending_by_sender(self) -> Dict[str, int]:
+        """Messages waiting per sender number, for least-loaded assignment"""
+        with self._cond:
+            return {sender: len(pending) for sender, pending in self._pending.items()}
+
+    def enqueue(self, to: str, message: str, callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Accept a message for delivery and return its ticket right away"""
+        if not self.twilio_service.client:
+            return {"success": False, "error": "Twilio client not initialized"}
+        from_number = self.twilio_service.sender_pool.assign(to, self._pending_by_sender())
+        if not from_number:
+            return {"success": False, "error": "Twilio phone number not configured"}
+
+        ticket_id = f"sms_{uuid.uuid4().hex[:16]}"
+        encoding = self.twilio_service.prepare_message(message)
+        ticket = {
+            "ticket_id": ticket_id,
+            "status": "queued",
+            "to": to,
+            "from": from_number,
+            "body": encoding["text"],
+            "encoding": encoding,
+            "attempts": 0,
+            "queued_at": time.time(),
+            "message_sid": None,
+            "error": None
+        }
+        with self._cond:
+            self._tickets[ticket_id] = ticket
+            if callback:
+                self._callbacks[ticket_id] = callback
+            self._trim()
+            self._pending.setdefault(from_number, deque()).append(ticket_id)
+            self._schedule(from_number, time.monotonic())
+            self._stats["accepted"] += 1
+        return {"success": True, "queued": True, "ticket_id": ticket_id, "status": "queued",
+                "to": to, "from": from_number, "body": encoding["text"], "segments": encoding["segments"],
+                "segments_saved": encoding["segments_saved"]}
+
+    def _next_ticket(self) -> Optional[Dict[str, Any]]:
+        """Block until some sender number has both a message and a token; None on shutdown"""
+        with self._cond:
+            while self._running:
+                now = time.monotonic()
+                if not self._ready or self._ready[0][0] > now:
+                    self._cond.wait(self._ready[0][0] - now if self._ready else None)
+                    continue
+                _, _, from_number = heapq.heappop(self._ready)
+                self._scheduled.discard(from_number)
+                pending = self._pending.get(from_number)
+                if not pending:
+                    continue
+                bucket = self._bucket(from_number)
+                wait = bucket.reserve(now)
+                if wait > 0:
+                    self._schedule(from_number, now + wait)
+                    continue
+                ticket = self._tickets.get(pending.popleft())
+                if pending:
+                    self._schedule(from_number, now)
+                if ticket is None:
+                    continue
+                ticket["status"] = "sending"
+                ticket["attempts"] += 1
+                if ticket["attempts"] == 1:
+                    self._stats["started"] += 1
+                    self._stats["queue_wait_ms_total"] += (time.time() - ticket["queued_at"]) * 1000
+                return ticket
+        return None
+
+    def _work(self):
+        """Delivery worker loop"""
+        while True:
+            ticket = self._next_ticket()
+            if ticket is None:
+                return
+            try:
+                result = self.twilio_service.send_sms(ticket["to"], ticket["body"], from_number=ticket["from"],
+                                                      encoding=ticket["encoding"])
+            except Exception as e:
+                result = {"success": False, "error": f"Failed to send SMS: {str(e)}"}
+            self._finish(ticket, result)
+
+    def _finish(self, ticket: Dict[str, Any], result: Dict[str, Any]):
+        """Record a delivery attempt; a 429 pauses the sender number and requeues the message at the front"""
+        callback = None
+        with self._cond:
+            if result.get("success"):
+                ticket.update(status="sent", message_sid=result.get("message_sid"),
+                              twilio_status=result.get("status"), sent_at=time.time())
+                self._stats["sent"] += 1
+            elif result.get("rate_limited") and ticket["attempts"] < self.max_attempts:
+                retry_after = result.get("retry_after") or 1.0
+                self._bucket(ticket["from"]).pause(retry_after, time.monotonic())
+                self._pending[ticket["from"]].appendleft(ticket["ticket_id"])
+                self._schedule(ticket["from"], time.monotonic())
+                ticket["status"] = "queued"
+                self._stats["rate_limited"] += 1
+                self._stats["retried"] += 1
+                print(f"[SMS QUEUE] Twilio returned 429 for {ticket['from']}, pausing it for {retry_after:.1f}s")
+            else:
+                ticket.update(status="failed", error=result.get("error"))
+                self._stats["failed"] += 1
+                if result.get("rate_limited"):
+                    self._stats["rate_limited"] += 1
+            if ticket["status"] in ("sent", "failed"):
+                callback = self._callbacks.pop(ticket["ticket_id"], None)
+            snapshot = dict(ticket)
+        if callback:
+            callback(snapshot)
+
+    def get_ticket(self, ticket_id: str) -> Optional[Dict[str, Any]]:
+        """Current state of a queued message"""
+        with self._cond:
+            ticket = self._tickets.get(ticket_id)
+            if not ticket:
+                return None
+            snapshot = {k: v for k, v in ticket.items() if k != "encoding"}
+        snapshot["segments"] = ticket["encoding"]["segments"]
+        snapshot["segments_saved"] = ticket["encoding"]["segments_saved"]
+        delivery_status = self.twilio_service.delivery_status
+        if delivery_status and snapshot["message_sid"]:
+            delivery = delivery_status.get(snapshot["message_sid"])
+            if delivery:
+                snapshot["delivery_status"] = delivery["status"]
+                snapshot["error_code"] = delivery["error_code"]
+        return snapshot
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Report queue depth, outcomes and how long messages waited for their sender number"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats["queued"] = sum(len(pending) for pending in self._pending.values())
+            stats["queued_by_sender"] = {sender: len(pending) for sender, pending in self._pending.items()}
+        wait_total = stats.pop("queue_wait_ms_total")
+        started = stats.pop("started")
+        stats["avg_queue_wait_ms"] = round(wait_total / started, 1) if started else None
+        return {
+            "enabled": True,
+            "workers": len(self._workers),
+            "rate_per_second": self.rate_per_second,
+            "burst": self.burst,
+            "service_rate_per_second": self.service_rate_per_second,
+            **stats
+        }
+
+    def shutdown(self):
+        """Stop the delivery workers; messages still queued are dropped"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
@@ -0,0 +1,80 @@
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Any, Optional
+
+# Every MessageParser pattern starts with one of these verbs...
+COMMAND_VERB_PATTERN = re.compile(r'\b(?:remind|reminder|text|sms|message|send|tell|notify|email)\b', re.IGNORECASE)
+# ...and separates the recipient from the message or time with one of these words
+CONNECTOR_PATTERN = re.compile(r'\b(?:saying|that|to|in|at|on|tomorrow|next|about|the message)\b', re.IGNORECASE)
+
+class Speculation:
+    """A Claude parse started before the regex cascade finished"""
+
+    def __init__(self, future: Future):
+        self.future = future
+        self.started = time.monotonic()
+        self.consumed = False
+
+class SpeculativeParser:
+    """Start Claude's parse_command alongside the regex cascade for commands the cascade will likely miss"""
+
+    def __init__(self, claude_service, max_workers: int):
+        self.claude_service = claude_service
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative-parse")
+        self._lock = threading.Lock()
+        self._stats = {
+            "speculated": 0,
+            "paid_off": 0,
+            "wasted": 0,
+            "cancelled": 0,
+            "parsed_inline": 0,
+            "head_start_ms_total": 0.0
+        }
+
+    @staticmethod
+    def likely_regex_miss(prompt: str) -> bool:
+        """Cheap check: no command verb or no connector word means no MessageParser pattern can match"""
+        return not COMMAND_VERB_PATTERN.search(prompt) or not CONNECTOR_PATTERN.search(prompt)
+
+    def start(self, prompt: str) -> Optional[Speculation]:
+        """Kick off the Claude parse in the background when the regex cascade is unlikely to match"""
+        if not self.likely_regex_miss(prompt):
+            return None
+        with self._lock:
+            self._stats["speculated"] += 1
+        return Speculation(self._executor.submit(self.claude_service.parse_command, prompt))
+
+    def resolve(self, speculation: Speculation, prompt: str) -> Dict[str, Any]:
+        """The regex cascade missed: use the speculative parse, or parse inline if it is still waiting for a worker"""
+        speculation.consumed = True
+        if speculation.future.cancel():
+            with self._lock:
+                self._stats["parsed_inline"] += 1
+            return self.claude_service.parse_command(prompt)
+        head_start_ms = (time.monotonic() - speculation.started) * 1000
+        with self._lock:
+            self._stats["paid_off"] += 1
+            self._stats["head_start_ms_total"] += head_start_ms
+        return speculation.future.result()
+
+    def discard(self, speculation: Speculation):
+        """The regex cascade matched first: cancel the speculative parse, or ignore it if already running"""
+        if speculation.consumed:
+            return
+        speculation.consumed = True
+        with self._lock:
+            if speculation.future.cancel():
+                self._stats["cancelled"] += 1
+            else:
+                self._stats["wasted"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Report how often speculation paid off and how much head start it gave Claude"""
+        with self._lock:
+            stats = dict(self._stats)
+        head_start_total = stats.pop("head_start_ms_total")
+        stats["avg_head_start_ms"] = round(head_start_total / stats["paid_off"], 2) if stats["paid_off"] else None
+        stats["hit_ratio"] = round(stats["paid_off"] / stats["speculated"], 3) if stats["speculated"] else 0.0
+        return stats
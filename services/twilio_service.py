@@ -1,7 +1,17 @@
-from typing import Dict, Any
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional
+from services.claude_metrics import percentile
+from services.sender_pool import SenderPool
+from services.delivery_status import DeliveryStatusStore
+from utils.sms_encoding import optimize_sms
+from config import Config
 
 try:
     from twilio.rest import Client
+    from twilio.request_validator import RequestValidator
+    from services.twilio_transport import PooledTwilioHttpClient
     TWILIO_AVAILABLE = True
 except ImportError:
     TWILIO_AVAILABLE = False
@@ -9,47 +19,198 @@ except ImportError:
 class TwilioService:
     """Twilio SMS service"""
     
-    def __init__(self, account_sid: str, auth_token: str, phone_number: str):
+    # The client's keep-alive connection is assumed still open this long after the last warm-up
+    WARM_INTERVAL_SECONDS = 30
+    
+    def __init__(self, account_sid: str, auth_token: str, phone_number: str, phone_numbers: Optional[List[str]] = None,
+                 messaging_service_sid: str = ""):
         self.account_sid = account_sid
         self.auth_token = auth_token
-        self.from_number = phone_number
+        self.sender_pool = SenderPool(phone_numbers or [phone_number], messaging_service_sid, Config.SENDER_ASSIGNMENTS_PATH)
+        self.from_number = phone_number or (self.sender_pool.senders[0] if self.sender_pool.senders else "")
         self.client = None
+        self.http_client = None
+        self.delivery_status = None
+        if Config.TWILIO_STATUS_CALLBACK_URL:
+            self.delivery_status = DeliveryStatusStore(
+                Config.DELIVERY_STATUS_PATH, Config.DELIVERY_STATUS_MEMORY_ENTRIES, Config.DELIVERY_STATUS_RETENTION
+            )
+        self._warmed_at = 0.0
+        # Twilio round-trip time vs. our own overhead per send (the timing hook runs on the sending thread)
+        self._local = threading.local()
+        self._timing_lock = threading.Lock()
+        self._api_ms = deque(maxlen=500)
+        self._overhead_ms = deque(maxlen=500)
+        self._api_errors = 0
+        self._encoding_lock = threading.Lock()
+        self._encoding_stats = {
+            "messages": 0,
+            "segments": 0,
+            "segments_saved": 0,
+            "transliterated": 0,
+            "trimmed": 0,
+            "ucs2_messages": 0,
+            "over_budget": 0
+        }
         
         if TWILIO_AVAILABLE and account_sid and auth_token:
             try:
-                self.client = Client(account_sid, auth_token)
+                self.http_client = PooledTwilioHttpClient(
+                    Config.TWILIO_POOL_SIZE,
+                    Config.TWILIO_CONNECT_TIMEOUT,
+                    Config.TWILIO_READ_TIMEOUT,
+                    Config.TWILIO_MAX_RETRIES,
+                    timing_hook=self._record_api_timing
+                )
+                self.client = Client(account_sid, auth_token, http_client=self.http_client)
                 print("✅ Twilio client initialized successfully")
             except Exception as e:
                 print(f"❌ Failed to initialize Twilio client: {e}")
         else:
             print("⚠️ Twilio not configured or library missing")
     
-    def send_sms(self, to: str, message: str) -> Dict[str, Any]:
-        """Send SMS via Twilio"""
+    def _record_api_timing(self, method: str, url: str, status, elapsed_ms: float, retries: int):
+        """Timing hook called by the HTTP client after every Twilio API request"""
+        self._local.api_ms = getattr(self._local, "api_ms", 0.0) + elapsed_ms
+        with self._timing_lock:
+            self._api_ms.append(elapsed_ms)
+            if status is None or status >= 400:
+                self._api_errors += 1
+    
+    def _finish_timing(self, started: float) -> Dict[str, float]:
+        """Split a send's wall time into the Twilio round trip and our own overhead"""
+        total_ms = (time.perf_counter() - started) * 1000
+        api_ms = getattr(self._local, "api_ms", 0.0)
+        with self._timing_lock:
+            self._overhead_ms.append(max(total_ms - api_ms, 0.0))
+        return {"api_ms": round(api_ms, 1), "overhead_ms": round(max(total_ms - api_ms, 0.0), 1)}
+    
+    def prepare_message(self, message: str) -> Dict[str, Any]:
+        """Fit a message to GSM-7 where safe and, under the trim or shorten policy, to SMS_MAX_SEGMENTS"""
+        trim = Config.SMS_OVERFLOW_POLICY in ("trim", "shorten")
+        return optimize_sms(message, Config.SMS_MAX_SEGMENTS, trim=trim, transliterate=Config.SMS_GSM_OPTIMIZE)
+    
+    def _record_encoding(self, encoding: Dict[str, Any]):
+        """Count a sent message's segments and what the optimizer saved"""
+        with self._encoding_lock:
+            stats = self._encoding_stats
+            stats["messages"] += 1
+            stats["segments"] += encoding["segments"]
+            stats["segments_saved"] += encoding["segments_saved"]
+            stats["transliterated"] += int(encoding["transliterated"])
+            stats["trimmed"] += int(encoding["trimmed"])
+            stats["ucs2_messages"] += int(encoding["encoding"] == "UCS-2")
+            if Config.SMS_MAX_SEGMENTS and encoding["segments"] > Config.SMS_MAX_SEGMENTS:
+                stats["over_budget"] += 1
+    
+    def send_sms(self, to: str, message: str, from_number: Optional[str] = None,
+                 encoding: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Send SMS via Twilio, from the recipient's sticky sender unless one is given
+
+        encoding is a prepare_message result when the caller (the queue) already fitted the message.
+        """
         if not self.client:
             return {"success": False, "error": "Twilio client not initialized"}
         
-        if not self.from_number:
+        sender = from_number or self.sender_pool.assign(to)
+        if not sender:
             return {"success": False, "error": "Twilio phone number not configured"}
         
+        encoding = encoding or self.prepare_message(message)
+        message = encoding["text"]
+        started = time.perf_counter()
+        self._local.api_ms = 0.0
         try:
-            message_response = self.client.messages.create(
-                body=message,
-                from_=self.from_number,
-                to=to
-            )
+            options = {"status_callback": Config.TWILIO_STATUS_CALLBACK_URL} if self.delivery_status else {}
+            if sender == self.sender_pool.messaging_service_sid:
+                message_response = self.client.messages.create(body=message, messaging_service_sid=sender, to=to, **options)
+            else:
+                message_response = self.client.messages.create(body=message, from_=sender, to=to, **options)
+            self.sender_pool.record_send(sender)
+            if self.delivery_status:
+                self.delivery_status.record_send(message_response.sid, to, sender, message_response.status)
+            self._record_encoding(encoding)
             
             return {
                 "success": True,
                 "message_sid": message_response.sid,
                 "status": message_response.status,
                 "to": to,
-                "from": self.from_number,
-                "body": message
+                "from": sender,
+                "body": message,
+                "encoding": encoding["encoding"],
+                "segments": encoding["segments"],
+                "segments_saved": encoding["segments_saved"],
+                "timing": self._finish_timing(started)
             }
             
         except Exception as e:
-            return {"success": False, "error": f"Failed to send SMS: {str(e)}"}
+            result = {"success": False, "error": f"Failed to send SMS: {str(e)}", "timing": self._finish_timing(started)}
+            if getattr(e, "status", None) == 429:
+                result["rate_limited"] = True
+                result["retry_after"] = self.http_client.last_retry_after()
+            return result
+    
+    def get_transport_stats(self) -> Dict[str, Any]:
+        """Report connection reuse, retries and Twilio latency separately from local overhead"""
+        if not self.http_client:
+            return {"enabled": False}
+        with self._timing_lock:
+            api_samples = sorted(self._api_ms)
+            overhead_samples = sorted(self._overhead_ms)
+            api_errors = self._api_errors
+        stats = {
+            "enabled": True,
+            **self.http_client.get_pool_stats(),
+            "connect_timeout": Config.TWILIO_CONNECT_TIMEOUT,
+            "read_timeout": Config.TWILIO_READ_TIMEOUT,
+            "api_errors": api_errors
+        }
+        if api_samples:
+            stats["api_p50_ms"] = round(percentile(api_samples, 0.5), 1)
+            stats["api_p95_ms"] = round(percentile(api_samples, 0.95), 1)
+        if overhead_samples:
+            stats["overhead_p50_ms"] = round(percentile(overhead_samples, 0.5), 1)
+            stats["overhead_p95_ms"] = round(percentile(overhead_samples, 0.95), 1)
+        return stats
+    
+    def validate_callback(self, url: str, params: Dict[str, Any], signature: str) -> bool:
+        """Check a webhook's X-Twilio-Signature against our auth token"""
+        if not Config.TWILIO_VALIDATE_WEBHOOKS:
+            return True
+        if not TWILIO_AVAILABLE or not self.auth_token:
+            return False
+        return RequestValidator(self.auth_token).validate(url, params, signature or "")
+    
+    def get_delivery_stats(self) -> Dict[str, Any]:
+        """Report status callbacks received and how status lookups were served"""
+        if not self.delivery_status:
+            return {"enabled": False}
+        return self.delivery_status.get_stats()
+    
+    def get_encoding_stats(self) -> Dict[str, Any]:
+        """Report segments billed and saved by GSM-7 transliteration and the overflow policy"""
+        with self._encoding_lock:
+            stats = dict(self._encoding_stats)
+        return {
+            "enabled": Config.SMS_GSM_OPTIMIZE,
+            "max_segments": Config.SMS_MAX_SEGMENTS,
+            "overflow_policy": Config.SMS_OVERFLOW_POLICY,
+            **stats,
+            "avg_segments": round(stats["segments"] / stats["messages"], 2) if stats["messages"] else None
+        }
+    
+    def warm_connection(self) -> bool:
+        """Open the client's TLS connection to Twilio ahead of a send with a cheap account fetch"""
+        if not self.client or time.monotonic() - self._warmed_at < self.WARM_INTERVAL_SECONDS:
+            return False
+        self._warmed_at = time.monotonic()
+        try:
+            self.client.api.accounts(self.account_sid).fetch()
+            return True
+        except Exception as e:
+            print(f"⚠️ Twilio warm-up failed: {e}")
+            return False
     
     def get_account_info(self) -> Dict[str, Any]:
         """Get Twilio account information"""
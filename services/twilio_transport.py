@@ -0,0 +1,92 @@
+import threading
+import time
+from typing import Callable, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from twilio.http.http_client import TwilioHttpClient
+
+# Methods that are safe to resend after the request may already have reached Twilio
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+def _never_sent(error: Exception) -> bool:
+    """Whether the connection failed before any of the request was written"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+class PooledTwilioHttpClient(TwilioHttpClient):
+    """Twilio HTTP client with a sized keep-alive pool, split timeouts, safe retries on connection errors and timing hooks"""
+
+    def __init__(self, pool_size: int, connect_timeout: float, read_timeout: float, max_retries: int,
+                 timing_hook: Optional[Callable[[str, str, Optional[int], float, int], None]] = None):
+        super().__init__(pool_connections=True)
+        # The base class only accepts a single number; requests takes a (connect, read) pair
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.timing_hook = timing_hook
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.retries = 0
+        # One pool of pool_size connections to api.twilio.com; extra threads open (and drop) overflow connections
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=False)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method, url, params=None, data=None, headers=None, auth=None, timeout=None, allow_redirects=False):
+        """Send one Twilio API request, retrying connection errors that cannot duplicate it, and report its timing
+
+        A POST (e.g. messages.create) is only retried when it never left this process; a reset mid-request may
+        already have sent the SMS.
+        """
+        started = time.perf_counter()
+        attempt = 0
+        status = None
+        try:
+            while True:
+                try:
+                    response = super().request(method, url, params=params, data=data, headers=headers, auth=auth,
+                                               timeout=timeout, allow_redirects=allow_redirects)
+                    status = response.status_code
+                    self._local.retry_after = response.headers.get("Retry-After") if status == 429 else None
+                    return response
+                except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+                    if attempt >= self.max_retries or (method.upper() not in IDEMPOTENT_METHODS and not _never_sent(e)):
+                        raise
+                    attempt += 1
+                    with self._lock:
+                        self.retries += 1
+        finally:
+            if self.timing_hook:
+                self.timing_hook(method, url, status, (time.perf_counter() - started) * 1000, attempt)
+
+    def last_retry_after(self) -> Optional[float]:
+        """Retry-After seconds from this thread's last request, if it was a 429"""
+        try:
+            return float(getattr(self._local, "retry_after", None))
+        except (TypeError, ValueError):
+            return None
+
+    def get_pool_stats(self):
+        """Requests sent and connections opened across the session's pools"""
+        requests_sent = 0
+        connections_opened = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                requests_sent += pool.num_requests
+                connections_opened += pool.num_connections
+        reused = max(requests_sent - connections_opened, 0)
+        return {
+            "pool_size": self.pool_size,
+            "requests": requests_sent,
+            "connections_opened": connections_opened,
+            "connections_reused": reused,
+            "reuse_ratio": round(reused / requests_sent, 3) if requests_sent else 0.0,
+            "retries": self.retries
+        }
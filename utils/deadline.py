@@ -0,0 +1,38 @@
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+class Deadline:
+    """Latency budget carried through a single request"""
+
+    def __init__(self, budget_ms: int, listener: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        self.budget_ms = budget_ms
+        self.expires_at = time.monotonic() + budget_ms / 1000.0
+        self.degradations: List[Dict[str, str]] = []
+        # Receives progress events for streaming responses; None for plain requests
+        self.listener = listener
+        # Enhancements already started from interim transcripts, keyed by (kind, text)
+        self.prefetched: Dict[Tuple[str, str], Future] = {}
+
+    def remaining(self) -> float:
+        """Seconds left in the budget (never negative)"""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        """Whether the budget has been used up"""
+        return self.remaining() <= 0
+
+    def record_degradation(self, stage: str, reason: str):
+        """Note that a stage fell back to its non-LLM result"""
+        print(f"[DEADLINE] Degraded {stage}: {reason}")
+        self.degradations.append({"stage": stage, "reason": reason})
+
+    def emit(self, event: str, data: Dict[str, Any]):
+        """Forward a progress event to the request's listener, if any"""
+        if self.listener:
+            self.listener(event, data)
+
+    @property
+    def degraded(self) -> bool:
+        """Whether any stage fell back"""
+        return bool(self.degradations)
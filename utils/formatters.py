@@ -1,5 +1,8 @@
 import re
-from typing import List
+from typing import Dict, List, Set
+
+# {first_name}-style placeholders in broadcast templates
+TEMPLATE_PLACEHOLDER_PATTERN = re.compile(r'\{(\w+)\}')
 
 def is_phone_number(recipient: str) -> bool:
     """Check if recipient looks like a phone number"""
@@ -45,4 +48,14 @@ def clean_voice_message(message: str) -> str:
     """Clean up voice recognition artifacts"""
     message = message.replace(" period", ".").replace(" comma", ",")
     message = message.replace(" question mark", "?").replace(" exclamation mark", "!")
-    return message.strip()
\ No newline at end of file
+    return message.strip()
+
+def template_placeholders(template: str) -> Set[str]:
+    """Names of the {placeholders} in a template"""
+    return set(TEMPLATE_PLACEHOLDER_PATTERN.findall(template))
+
+def render_template(template: str, variables: Dict[str, str]) -> str:
+    """Fill {placeholders} from variables; missing ones are dropped rather than sent literally"""
+    rendered = TEMPLATE_PLACEHOLDER_PATTERN.sub(lambda m: str(variables.get(m.group(1), "")), template)
+    rendered = re.sub(r'\s+([,.!?])', r'\1', rendered)
+    return re.sub(r'[ \t]{2,}', ' ', rendered).strip()
@@ -0,0 +1,84 @@
+import math
+import unicodedata
+from typing import Dict, Any
+
+# GSM 03.38 default alphabet (one septet each) and its extension table (escape + character, two septets)
+GSM7_BASIC = set(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+GSM7_EXTENDED = set("^{}\\[~]|€\f")
+
+# Replacements that keep the meaning: typographic punctuation and spacing Claude tends to produce
+TRANSLITERATIONS = {
+    "‘": "'", "’": "'", "‚": "'", "‛": "'", "′": "'", "´": "'", "`": "'",
+    "“": '"', "”": '"', "„": '"', "‟": '"', "″": '"', "«": '"', "»": '"',
+    "‐": "-", "‑": "-", "‒": "-", "–": "-", "—": "-", "―": "-", "−": "-",
+    "…": "...", "•": "-", "·": "-",
+    "\u00a0": " ", "\u2002": " ", "\u2003": " ", "\u2009": " ", "\u200a": " ", "\u202f": " ",
+    "\u200b": "", "\u200d": "", "\ufeff": "",
+    "™": "TM", "©": "(c)", "®": "(R)",
+}
+
+def is_gsm7(text: str) -> bool:
+    """Whether every character fits the GSM-7 alphabet"""
+    return all(ch in GSM7_BASIC or ch in GSM7_EXTENDED for ch in text)
+
+def count_segments(text: str) -> Dict[str, Any]:
+    """Encoding, length in encoding units and billed segments (160/153 for GSM-7, 70/67 for UCS-2)"""
+    if is_gsm7(text):
+        units = sum(2 if ch in GSM7_EXTENDED else 1 for ch in text)
+        single, multi, encoding = 160, 153, "GSM-7"
+    else:
+        units = len(text.encode("utf-16-le")) // 2
+        single, multi, encoding = 70, 67, "UCS-2"
+    segments = 1 if units <= single else math.ceil(units / multi)
+    return {"encoding": encoding, "units": units, "segments": segments}
+
+def _transliterate_char(ch: str) -> str:
+    """GSM-7 stand-in for one character, or the character itself when there is no safe one"""
+    if ch in GSM7_BASIC or ch in GSM7_EXTENDED:
+        return ch
+    if ch in TRANSLITERATIONS:
+        return TRANSLITERATIONS[ch]
+    # Accented letters outside the alphabet lose only their accent (á -> a); emoji and other scripts are kept
+    base = "".join(c for c in unicodedata.normalize("NFKD", ch) if not unicodedata.combining(c))
+    return base if base and is_gsm7(base) else ch
+
+def to_gsm7(text: str) -> str:
+    """Replace non-GSM characters that have a safe equivalent"""
+    return "".join(_transliterate_char(ch) for ch in text)
+
+def trim_to_segments(text: str, max_segments: int) -> str:
+    """Cut text at a word boundary so it fits max_segments, marking the cut with ..."""
+    if count_segments(text)["segments"] <= max_segments:
+        return text
+    gsm = is_gsm7(text)
+    limit = (160 if max_segments == 1 else 153 * max_segments) if gsm else (70 if max_segments == 1 else 67 * max_segments)
+    cut = text[:max(limit - 3, 0)]
+    while count_segments(cut + "...")["segments"] > max_segments:
+        cut = cut[:-1]
+    if " " in cut:
+        cut = cut[:cut.rindex(" ")]
+    return cut.rstrip(" ,;:-") + "..."
+
+def optimize_sms(text: str, max_segments: int = 0, trim: bool = False, transliterate: bool = True) -> Dict[str, Any]:
+    """Transliterate to GSM-7 where safe (and optionally trim to max_segments), reporting segments saved"""
+    before = count_segments(text)
+    optimized = to_gsm7(text) if transliterate else text
+    transliterated = optimized != text
+    trimmed = False
+    if trim and max_segments > 0 and count_segments(optimized)["segments"] > max_segments:
+        optimized = trim_to_segments(optimized, max_segments)
+        trimmed = True
+    after = count_segments(optimized)
+    return {
+        "text": optimized,
+        "encoding": after["encoding"],
+        "segments": after["segments"],
+        "original_encoding": before["encoding"],
+        "original_segments": before["segments"],
+        "segments_saved": before["segments"] - after["segments"],
+        "transliterated": transliterated,
+        "trimmed": trimmed
+    }